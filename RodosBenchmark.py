@@ -0,0 +1,159 @@
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+from time import monotonic
+
+import RodosSimulator
+
+sys.modules['hid'] = RodosSimulator
+
+from TempScanner import RODOS_HID, TemperatureScanner, Config, Logger
+
+
+def configure(sensor_list, temp_file_path, completion_polling=False):
+    Config.ARGUMENTS = argparse.Namespace(idle=False, verbose=False, log_level='WARNING', rescan=False, config='', show=False, pipeline=False)
+    Config._load_from_dict({
+        'sensor_list': sensor_list,
+        'temp_file_path': temp_file_path,
+        'loggers': [],
+        'reading_period': Config.DEFAULT_READING_PERIOD,
+        'temp_currency': Config.DEFAULT_TEMP_CURRENCY,
+        'completion_polling': completion_polling,
+    })
+
+
+def count_transfers(adapters):
+    return sum(adapter.transfers for adapter in adapters)
+
+
+def bench_search(session, adapters, family=None):
+    transfers = count_transfers(adapters)
+    start_time = monotonic()
+    session.search_sensors(family)
+    delta_time = monotonic() - start_time
+    return delta_time, count_transfers(adapters) - transfers, len(session.sensors)
+
+
+def bench_search_sweep(sizes, families, seed, latency, family=None):
+    print('=' * 40)
+    print('Датчиков  Найдено  Время, сек.  Обменов  Обменов на датчик')
+    for size in sizes:
+        buses, adapters = RodosSimulator.attach_buses(size, families, seed, latency)
+        session = RODOS_HID.open()
+        delta_time, transfers, found = bench_search(session, adapters, family)
+        print(f'{size:8d}  {found:7d}  {delta_time:11.3f}  {transfers:7d}  {transfers / max(found, 1):17.1f}')
+    print('=' * 40)
+
+
+def bench_cycle(scanner, adapters, cycles):
+    results = []
+    for cycle in range(cycles):
+        transfers = count_transfers(adapters)
+        start_time = monotonic()
+        scanner.get_temperature()
+        results.append((monotonic() - start_time, count_transfers(adapters) - transfers))
+    return results
+
+
+def legacy_crc8(CRC, D):
+    R = CRC
+    for i in range(8):
+        if (R ^ (D >> i)) & 0x01 == 0x01:
+            R = ((R ^ 0x18) >> 1) | 0x80
+        else:
+            R = (R >> 1) & 0x7F
+    return R
+
+
+def legacy_decode(FAMILY, scratchpad):
+    CRC = 0
+    for D in scratchpad:
+        CRC = legacy_crc8(CRC, D)
+    K = scratchpad[0] + (scratchpad[1] << 8)
+    T = 1000
+    if FAMILY == 0x28 or FAMILY == 0x22:
+        T = K * 0.0625
+    elif FAMILY == 0x10:
+        T = K * 0.5
+    return CRC == 0, T
+
+
+def table_decode(session, FAMILY, scratchpad):
+    return session.crc8_block(scratchpad) == 0, session.decode_temperature(FAMILY, scratchpad)
+
+
+def bench_decode(iterations):
+    session = RODOS_HID(None)
+    samples = []
+    for family, temperature in ((0x28, 21.5), (0x28, -10.125), (0x22, 85.0), (0x10, -0.5)):
+        sensor = RodosSimulator.VirtualSensor(RodosSimulator.make_rom(family, len(samples) + 1), temperature=temperature)
+        sensor.raw = sensor.encode_temperature(temperature)
+        samples.append((family, temperature, list(sensor.scratchpad())))
+    print('=' * 40)
+    print('Семейство  Ожидается  Прежний разбор  Табличный разбор')
+    for family, temperature, scratchpad in samples:
+        print(f'{family:#9x}  {temperature:9.4f}  {legacy_decode(family, scratchpad)[1]:14.4f}  {table_decode(session, family, bytes(scratchpad))[1]:16.4f}')
+    legacy_time = timeit.timeit(lambda: [legacy_decode(family, scratchpad) for family, temperature, scratchpad in samples], number=iterations)
+    table_time = timeit.timeit(lambda: [table_decode(session, family, memoryview(bytes(scratchpad))) for family, temperature, scratchpad in samples], number=iterations)
+    count = iterations * len(samples)
+    print(f'Прежний разбор: {legacy_time / count * 1e6:.2f} мкс на блокнот')
+    print(f'Табличный разбор: {table_time / count * 1e6:.2f} мкс на блокнот')
+    print('=' * 40)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замер задержек RODOS_HID на программном симуляторе RODOS-5.')
+    parser.add_argument('-n', '--sensors', type=int, default=50, help='Количество датчиков на каждой шине')
+    parser.add_argument('-a', '--adapters', type=int, default=1, help='Количество адаптеров')
+    parser.add_argument('-c', '--cycles', type=int, default=3, help='Количество циклов считывания температуры')
+    parser.add_argument('-f', '--families', type=str, default='28', help='Семейства датчиков через запятую (28, 22, 10)')
+    parser.add_argument('--seed', type=int, default=1, help='Начальное значение генератора адресов датчиков')
+    parser.add_argument('--latency', type=float, default=0.0005, help='Время выполнения команды адаптером, сек.')
+    parser.add_argument('--polling', action='store_true', help='Ожидать завершения команд опросом адаптера вместо фиксированных задержек')
+    parser.add_argument('--family-search', type=str, default='', help='Искать только датчики указанного семейства (например, 28)')
+    parser.add_argument('--search-sweep', type=str, default='', help='Замерить только поиск для нескольких размеров шины, например: 10,25,50,100')
+    parser.add_argument('--skip-search', action='store_true', help='Не замерять поиск датчиков')
+    parser.add_argument('--decode', type=int, default=0, help='Замерить только разбор блокнота датчика: количество повторов')
+    args = parser.parse_args()
+
+    if args.decode:
+        Logger.enable_stream_handler('WARNING')
+        configure([], '', args.polling)
+        bench_decode(args.decode)
+        return
+
+    families = tuple(int(family, 16) for family in args.families.split(','))
+    family = int(args.family_search, 16) if args.family_search else None
+    if args.search_sweep:
+        Logger.enable_stream_handler('WARNING')
+        configure([], '', args.polling)
+        bench_search_sweep([int(size) for size in args.search_sweep.split(',')], families, args.seed, args.latency, family)
+        return
+
+    buses, adapters = RodosSimulator.attach_buses(args.sensors, families, args.seed, args.latency, args.adapters)
+    sensor_list = [sensor.rom for bus in buses for sensor in bus.sensors]
+
+    Logger.enable_stream_handler('WARNING')
+    Config.logger.update()
+    temp_file_path = os.path.join(tempfile.mkdtemp(), 'SSI.temp')
+    configure(sensor_list, temp_file_path, args.polling)
+
+    sessions = RODOS_HID.open_all()
+
+    print('=' * 40)
+    print(f'Адаптеров: {len(sessions)}, датчиков: {len(sensor_list)}')
+    if not args.skip_search:
+        for session in sessions:
+            delta_time, transfers, found = bench_search(session, adapters, family)
+            print(f'search_rom {session.path}: найдено {found} за {delta_time:.3f} сек., обменов с адаптером: {transfers}')
+
+    scanner = TemperatureScanner(sessions)
+    for cycle, (delta_time, transfers) in enumerate(bench_cycle(scanner, adapters, args.cycles)):
+        print(f'get_temperature #{cycle}: {delta_time:.3f} сек., обменов с адаптерами: {transfers}, на датчик: {delta_time / len(sensor_list) * 1000:.1f} мс')
+    print('=' * 40)
+
+
+if __name__ == '__main__':
+    main()
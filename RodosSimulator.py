@@ -0,0 +1,450 @@
+import random
+from time import monotonic
+
+FAMILY_DS18S20 = 0x10
+FAMILY_DS1822 = 0x22
+FAMILY_DS18B20 = 0x28
+
+RODOS_VENDOR_ID = 0x20a0
+RODOS_PRODUCT_ID = 0x4173
+RODOS_MANUFACTURER = 'www.masterkit.ru'
+RODOS_PRODUCT = 'RODOS-5'
+
+_ADAPTERS = []
+
+
+def crc8(data):
+    CRC = 0
+    for D in data:
+        for i in range(8):
+            if (CRC ^ (D >> i)) & 0x01 == 0x01:
+                CRC = ((CRC ^ 0x18) >> 1) | 0x80
+            else:
+                CRC = (CRC >> 1) & 0x7F
+    return CRC
+
+
+def make_rom(family, serial):
+    data = [family] + [(serial >> (i * 8)) & 0xFF for i in range(6)]
+    data.append(crc8(data))
+    return sum(data[i] << (i * 8) for i in range(8))
+
+
+class VirtualSensor:
+    CONVERSION_TIMES = (0.09375, 0.1875, 0.375, 0.75)
+    COPY_TIME = 0.01
+    POWER_ON_RAW = 0x0550
+
+    def __init__(self, family=FAMILY_DS18B20, serial=None, temperature=25.0, rom=None):
+        if rom is None:
+            if serial is None:
+                serial = random.getrandbits(48)
+            rom = make_rom(family, serial)
+        self.rom = rom
+        self.family = rom & 0xFF
+        self.temperature = temperature
+        self.th, self.tl, self.config = 0x4B, 0x46, 0x7F
+        self.eeprom = [self.th, self.tl, self.config]
+        self.raw = self.POWER_ON_RAW if self.family != FAMILY_DS18S20 else 0x00AA
+        self.alarm = False
+        self.parasite = False
+        self._converting = False
+
+        self.present = True
+        self.dropouts = 0
+        self.crc_errors = 0
+        self.stuck_bits = {}
+
+        self.conversions = 0
+        self.eeprom_writes = 0
+        self._busy_until = 0
+        self._session = None
+        self._output = 1
+
+    @property
+    def resolution(self):
+        if self.family == FAMILY_DS18S20:
+            return 3
+        return (self.config >> 5) & 0x03
+
+    @property
+    def conversion_time(self):
+        return self.CONVERSION_TIMES[self.resolution]
+
+    def current_temperature(self, now):
+        if callable(self.temperature):
+            return self.temperature(now)
+        return self.temperature
+
+    def encode_temperature(self, T):
+        if self.family == FAMILY_DS18S20:
+            return int(round(T * 2)) & 0xFFFF
+        raw = int(round(T * 16))
+        raw &= ~((1 << (3 - self.resolution)) - 1)
+        return raw & 0xFFFF
+
+    def _latch(self, now):
+        if self._busy_until and now >= self._busy_until:
+            self._busy_until = 0
+            if self._converting:
+                self._converting = False
+                self.raw = self.encode_temperature(self.current_temperature(now))
+                self._update_alarm()
+
+    def _update_alarm(self):
+        raw = self.raw - 0x10000 if self.raw & 0x8000 else self.raw
+        T = raw >> 1 if self.family == FAMILY_DS18S20 else raw >> 4
+        th = self.th - 0x100 if self.th & 0x80 else self.th
+        tl = self.tl - 0x100 if self.tl & 0x80 else self.tl
+        self.alarm = T >= th or T <= tl
+
+    def busy(self, now=None):
+        now = monotonic() if now is None else now
+        self._latch(now)
+        return self._busy_until != 0
+
+    def start_conversion(self, now=None):
+        now = monotonic() if now is None else now
+        self._latch(now)
+        self._converting = True
+        self._busy_until = now + self.conversion_time
+        self.conversions += 1
+
+    def copy_scratchpad(self, now=None):
+        now = monotonic() if now is None else now
+        self._latch(now)
+        self._converting = False
+        self.eeprom = [self.th, self.tl, self.config]
+        self.eeprom_writes += 1
+        self._busy_until = now + self.COPY_TIME
+
+    def recall_eeprom(self):
+        self.th, self.tl, self.config = self.eeprom
+
+    def scratchpad(self, now=None):
+        now = monotonic() if now is None else now
+        self._latch(now)
+        if self.family == FAMILY_DS18S20:
+            data = [self.raw & 0xFF, self.raw >> 8, self.th, self.tl, 0xFF, 0xFF, 0x0C, 0x10]
+        else:
+            data = [self.raw & 0xFF, self.raw >> 8, self.th, self.tl, self.config, 0xFF, 0x0C, 0x10]
+        data.append(crc8(data))
+        if self.crc_errors > 0:
+            self.crc_errors -= 1
+            data[0] ^= 0x01
+        for index, value in self.stuck_bits.items():
+            if value:
+                data[index // 8] |= 1 << (index % 8)
+            else:
+                data[index // 8] &= ~(1 << (index % 8))
+        return data
+
+    def _busy_bit(self):
+        if self.parasite:
+            return 1
+        return 0 if self.busy() else 1
+
+    def on_reset(self):
+        self._latch(monotonic())
+        self._session = None
+        self._output = 1
+        if not self.present:
+            return False
+        if self.dropouts > 0:
+            self.dropouts -= 1
+            return False
+        self._session = self._rom_command()
+        self._output = next(self._session)
+        return True
+
+    def drive(self):
+        if self._session is None:
+            return 1
+        if callable(self._output):
+            return self._output()
+        return self._output
+
+    def sample(self, bit):
+        if self._session is None:
+            return
+        try:
+            self._output = self._session.send(bit)
+        except StopIteration:
+            self._session = None
+            self._output = 1
+
+    def _receive_byte(self):
+        value = 0
+        for i in range(8):
+            bit = yield 1
+            value |= bit << i
+        return value
+
+    def _send_bytes(self, data):
+        for B in data:
+            for i in range(8):
+                yield (B >> i) & 0x01
+
+    def _rom_command(self):
+        command = yield from self._receive_byte()
+        if command == 0x33:
+            yield from self._send_bytes([(self.rom >> (i * 8)) & 0xFF for i in range(8)])
+            return
+        elif command == 0x55:
+            ROM = 0
+            for i in range(64):
+                bit = yield 1
+                ROM |= bit << i
+            if ROM != self.rom:
+                return
+        elif command == 0xCC:
+            pass
+        elif command == 0xF0 or (command == 0xEC and self.alarm):
+            for i in range(64):
+                BIT = (self.rom >> i) & 0x01
+                yield BIT
+                yield BIT ^ 0x01
+                direction = yield 1
+                if direction != BIT:
+                    return
+            return
+        else:
+            return
+        yield from self._function_command()
+
+    def _function_command(self):
+        command = yield from self._receive_byte()
+        if command == 0x44:
+            self.start_conversion()
+            while True:
+                yield self._busy_bit
+        elif command == 0xBE:
+            yield from self._send_bytes(self.scratchpad())
+        elif command == 0x4E:
+            self.th = yield from self._receive_byte()
+            self.tl = yield from self._receive_byte()
+            if self.family != FAMILY_DS18S20:
+                config = yield from self._receive_byte()
+                self.config = (config & 0x60) | 0x1F
+        elif command == 0x48:
+            self.copy_scratchpad()
+            while True:
+                yield self._busy_bit
+        elif command == 0xB8:
+            self.recall_eeprom()
+            while True:
+                yield 1
+        elif command == 0xB4:
+            while True:
+                yield 0 if self.parasite else 1
+
+
+class OneWireBus:
+    SLOT_TIME = 70e-6
+    RESET_TIME = 960e-6
+
+    def __init__(self, sensors=()):
+        self.sensors = list(sensors)
+        self.stuck_low = False
+        self.resets = 0
+        self.slots = 0
+
+    def add(self, sensor):
+        self.sensors.append(sensor)
+        return sensor
+
+    def remove(self, rom):
+        self.sensors = [sensor for sensor in self.sensors if sensor.rom != rom]
+
+    def find(self, rom):
+        for sensor in self.sensors:
+            if sensor.rom == rom:
+                return sensor
+        return None
+
+    def reset(self):
+        self.resets += 1
+        presence = False
+        for sensor in self.sensors:
+            presence = sensor.on_reset() or presence
+        return presence or self.stuck_low
+
+    def slot(self, bit):
+        self.slots += 1
+        value = bit & 0x01
+        for sensor in self.sensors:
+            value &= sensor.drive()
+        if self.stuck_low:
+            value = 0
+        for sensor in self.sensors:
+            sensor.sample(value)
+        return value
+
+
+class VirtualAdapter:
+    def __init__(self, bus=None, path=None, serial_number='', latency=0.0005, stale_reports=False):
+        self.bus = bus if bus is not None else OneWireBus()
+        self.path = path if path is not None else f'rodos-sim:{len(_ADAPTERS)}'.encode()
+        self.serial_number = serial_number
+        self.latency = latency
+        self.stale_reports = stale_reports
+        self.port = 0
+        self.transfers = 0
+        self._report = [0] * 9
+        self._previous = [0] * 9
+        self._ready_at = 0
+
+    def info(self):
+        return {
+            'path': self.path,
+            'vendor_id': RODOS_VENDOR_ID,
+            'product_id': RODOS_PRODUCT_ID,
+            'serial_number': self.serial_number,
+            'release_number': 0x0100,
+            'manufacturer_string': RODOS_MANUFACTURER,
+            'product_string': RODOS_PRODUCT,
+            'usage_page': 0,
+            'usage': 0,
+            'interface_number': 0,
+        }
+
+    def _slots(self, bits):
+        return [self.bus.slot(bit) for bit in bits]
+
+    def command(self, data):
+        data = list(data) + [0] * (9 - len(data))
+        self.transfers += 1
+        report = [0] * 9
+        duration = self.latency
+        if data[1] == 0x18:
+            op = data[2]
+            report[1], report[2] = 0x18, op
+            if op == 0x48:
+                report[3] = 0x00 if self.bus.reset() else 0x01
+                duration += self.bus.RESET_TIME
+            elif op == 0x81:
+                report[3] = self._slots([data[3] & 0x01])[0]
+                duration += self.bus.SLOT_TIME
+            elif op == 0x82:
+                report[3], report[4] = self._slots([data[3] & 0x01, data[4] & 0x01])
+                duration += 2 * self.bus.SLOT_TIME
+            elif op in (0x88, 0x84):
+                for n in range(1 if op == 0x88 else 4):
+                    bits = self._slots([(data[3 + n] >> i) & 0x01 for i in range(8)])
+                    report[3 + n] = sum(bits[i] << i for i in range(8))
+                duration += (8 if op == 0x88 else 32) * self.bus.SLOT_TIME
+            else:
+                report = [0] * 9
+        elif data[1] == 0x7E:
+            report[1], report[2], report[3] = 0x7E, self.port, self.port
+        elif data[1] == 0xE7:
+            self.port = data[2]
+            report[1], report[2], report[3] = 0xE7, self.port, self.port
+        self._previous = self._report
+        self._report = report
+        self._ready_at = monotonic() + duration
+
+    def report(self):
+        if monotonic() < self._ready_at:
+            return list(self._previous) if self.stale_reports else [0] * 9
+        return list(self._report)
+
+
+class device:
+    def __init__(self):
+        self.adapter = None
+
+    def open(self, vendor_id=0, product_id=0, serial_number=None):
+        for adapter in _ADAPTERS:
+            if vendor_id and vendor_id != RODOS_VENDOR_ID:
+                continue
+            if product_id and product_id != RODOS_PRODUCT_ID:
+                continue
+            if serial_number is not None and serial_number != adapter.serial_number:
+                continue
+            self.adapter = adapter
+            return
+        raise IOError('open failed')
+
+    def open_path(self, path):
+        for adapter in _ADAPTERS:
+            if adapter.path == path:
+                self.adapter = adapter
+                return
+        raise IOError('open failed')
+
+    def close(self):
+        self.adapter = None
+
+    def _check(self):
+        if self.adapter is None:
+            raise ValueError('not open')
+
+    def get_manufacturer_string(self):
+        self._check()
+        return RODOS_MANUFACTURER
+
+    def get_product_string(self):
+        self._check()
+        return RODOS_PRODUCT
+
+    def get_serial_number_string(self):
+        self._check()
+        return self.adapter.serial_number
+
+    def set_nonblocking(self, value):
+        self._check()
+        return 0
+
+    def send_feature_report(self, data):
+        self._check()
+        self.adapter.command(data)
+        return len(data)
+
+    def get_feature_report(self, report_id, max_length):
+        self._check()
+        return self.adapter.report()[:max_length]
+
+
+def enumerate(vendor_id=0, product_id=0):
+    if (vendor_id and vendor_id != RODOS_VENDOR_ID) or (product_id and product_id != RODOS_PRODUCT_ID):
+        return []
+    return [adapter.info() for adapter in _ADAPTERS]
+
+
+def attach(adapter):
+    _ADAPTERS.append(adapter)
+    return adapter
+
+
+def detach(adapter):
+    _ADAPTERS.remove(adapter)
+
+
+def detach_all():
+    _ADAPTERS.clear()
+
+
+def make_bus(count, families=(FAMILY_DS18B20,), temperature=25.0, seed=None):
+    rnd = random.Random(seed)
+    bus = OneWireBus()
+    roms = set()
+    while len(bus.sensors) < count:
+        family = families[len(bus.sensors) % len(families)]
+        rom = make_rom(family, rnd.getrandbits(48))
+        if rom in roms:
+            continue
+        roms.add(rom)
+        T = temperature + rnd.uniform(-5, 5) if not callable(temperature) else temperature
+        bus.add(VirtualSensor(rom=rom, temperature=T))
+    return bus
+
+
+def attach_buses(count, families=(FAMILY_DS18B20,), seed=None, latency=0.0005, adapters=1, stale_reports=False):
+    detach_all()
+    buses = []
+    for index in range(adapters):
+        bus = make_bus(count, families=families, seed=None if seed is None else seed + index)
+        attach(VirtualAdapter(bus, latency=latency, stale_reports=stale_reports))
+        buses.append(bus)
+    return buses, list(_ADAPTERS)
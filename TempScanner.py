@@ -1,421 +1,1247 @@
 from distutils.command.config import config
 from locale import currency
 from re import T
-from time import sleep, monotonic
+from time import sleep, monotonic, time
 import logging
 import argparse
 import json
 import os
 import platform
 import sys
+import signal
 import inspect
 from datetime import date, datetime
 import tracemalloc
+import threading
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import hid
 
+from TempStorage import HistoryFile, LatestTable, ColumnStore, print_report, parse_date
+
+def make_crc8_table():
+    TABLE = []
+    for D in range(256):
+        R = D
+        for i in range(8):
+            if R & 0x01:
+                R = (R >> 1) ^ 0x8C
+            else:
+                R >>= 1
+        TABLE.append(R)
+    return tuple(TABLE)
+
+class RetryPolicy:
+    def __init__(self, attempts=3, backoff=0, sensor_budget=0, cycle_budget=0):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.sensor_budget = sensor_budget
+        self.cycle_budget = cycle_budget
+        self.sensor_deadline = None
+        self.cycle_deadline = None
+        self.exhausted = 0
+
+    def start_cycle(self):
+        self.cycle_deadline = monotonic() + self.cycle_budget if self.cycle_budget else None
+
+    def stop_cycle(self):
+        self.cycle_deadline = None
+
+    def start_sensor(self):
+        self.sensor_deadline = monotonic() + self.sensor_budget if self.sensor_budget else None
+
+    def stop_sensor(self):
+        self.sensor_deadline = None
+
+    def remaining(self):
+        deadlines = [deadline for deadline in (self.sensor_deadline, self.cycle_deadline) if deadline is not None]
+        if not deadlines:
+            return None
+        return min(deadlines) - monotonic()
+
+    def cycle_expired(self):
+        return self.cycle_deadline is not None and monotonic() >= self.cycle_deadline
+
+    def tries(self):
+        for attempt in range(self.attempts):
+            remaining = self.remaining()
+            if attempt and self.backoff:
+                pause = self.backoff * 2 ** (attempt - 1)
+                if remaining is not None:
+                    pause = min(pause, remaining)
+                if pause > 0:
+                    sleep(pause)
+                remaining = self.remaining()
+            if remaining is not None and remaining <= 0:
+                self.exhausted += 1
+                return
+            yield attempt
+
 class RODOS_HID:
-    USB_BUFI = [0] * 9
-    USB_BUFO = [0] * 9
-    TEMPERATURE_LOG = {}
     CURRENCY_LEVELS = (0x00, 0x20, 0x40, 0x60)
-    initialized = False
+    CONVERSION_TIMES = (93.75/1000, 187.5/1000, 375/1000, 750/1000)
+    CONVERSION_POLL_DELAY = 5/1000
+    EEPROM_COPY_TIME = 10/1000
+    OW_TRANSFER_DELAYS = {1: 5/1000, 4: 30/1000}
+    OW_SLOT_COMMANDS = ((32, 0x84, 30/1000), (8, 0x88, 5/1000), (2, 0x82, 2/1000), (1, 0x81, 5/1000))
+    POLL_SPIN_COUNT = 2
+    POLL_MIN_DELAY = 0.5/1000
+    POLL_MAX_DELAY = 4/1000
+    POLL_TIMEOUT = 100/1000
+    CRC8_TABLE = make_crc8_table()
+    RESOLUTION_MASKS = (~0x07, ~0x03, ~0x01, ~0x00)
+    OW_REPORTS = {OPCODE: bytes((0x00, 0x18, OPCODE, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00)) for OPCODE in (0x48, 0x81, 0x82, 0x88, 0x84)}
+    OW_READ_REPORTS = {
+        0x81: bytes((0x00, 0x18, 0x81, 0x01, 0x00, 0x00, 0x00, 0x00, 0x00)),
+    }
+    READ_ROM_PAYLOAD = bytes((0x33,)) + bytes((0xFF,)) * 8
+    SKIP_ROM_READ_SCRATCHPAD = bytes((0xCC, 0xBE)) + bytes((0xFF,)) * 10
+    SINGLE_DROP_CHECK_PERIOD = 100
+
+    def __init__(self, device, path=b''):
+        self.logger = Logger(self.__class__.__name__)
+        self.device = device
+        self.path = path
+        self.lock = threading.RLock()
+        self.USB_BUFI = bytearray(9)
+        self.USB_BUFO = bytearray(9)
+        self.transfer_buffer = bytearray(20)
+        self.transfer_view = memoryview(self.transfer_buffer)
+        self.match_rom_payloads = {}
+        self.read_scratchpad_payloads = {}
+        self.single_drop = None
+        self.single_drop_reads = 0
+        self.search_mismatch = False
+        self.search_empty = False
+        self.alarm_sensors = []
+        self.discovered = []
+        self.missing = []
+        self.retry = RetryPolicy(**Config.RETRY_POLICY)
+        self.TEMPERATURE_LOG = {}
+        self.sensors = []
+        self.completion_polling = Config.COMPLETION_POLLING
+        self.stale_reports = True
+        self.last_command = None
+        self.parasite_power = False
+        self.conversion_start = 0
+        self.conversion_pending = False
+        self.bus_resets = 0
+        self.conversion_resets = 0
+        self.no_presence = False
 
     @classmethod
-    def initialize(cls):
+    def open(cls, device_info=None):
         cls.logger = Logger(cls.__name__)
         cls.logger.debug('Инициализация объекта класса RODOS_HID')    
-        cls.device = hid.device()
-        vid, pid = RODOS_HID.find_device()
-        cls.device.open(vid, pid)
+        if device_info is None:
+            device_info = cls.find_devices()[0]
+        vid, pid, path = device_info['vendor_id'], device_info['product_id'], device_info['path']
+        device = hid.device()
+        device.open_path(path)
         try:
-            cls.device.get_feature_report(0, 9)
+            device.get_feature_report(0, 9)
         except ValueError:
             cls.logger.critical('Ошибка открытия устройства. Завершение программы')
             sys.exit()
         else:
-            cls.logger.info(f'Устройство "{hex(vid)}:{hex(pid)}" успешно открыто')
-        cls.set_temperature_currency(Config.DEFAULT_TEMP_CURRENCY)
-        cls.initialized = True
+            cls.logger.info(f'Устройство "{hex(vid)}:{hex(pid)}" ({path}) успешно открыто')
+        session = cls(device, path)
+        if session.completion_polling:
+            session.check_busy_reports()
+        session.read_power_supply()
+        return session
+
+    @classmethod
+    def open_all(cls):
+        cls.logger = Logger(cls.__name__)
+        return [cls.open(device_info) for device_info in cls.find_devices()]
         
     @classmethod
-    def find_device(cls):
-        cls.logger.debug('Поиск HID-устройства')
+    def find_devices(cls):
+        cls.logger.debug('Поиск HID-устройств')
+        devices = []
         for device in hid.enumerate():
             if device['manufacturer_string'] == 'www.masterkit.ru' or device['vendor_id'] == 0x20a0:
-                cls.logger.info(f'''Найдено устройство [{hex(device['vendor_id'])}:{hex(device['product_id'])}]''')
-                return device['vendor_id'], device['product_id']
-        cls.logger.critical('Подходящих устройств не найдено. Завершение программы.')
-        sys.exit()
-    
-    @classmethod
-    def find_sensors(cls):
-        cls.TEMPERATURE_LOG = {}
-        cls.sensors = []
-        if cls.search_rom(0, 0):
-            cls.logger.info("Найдено DALLAS - {}".format(len(cls.sensors)))
-        else:
-            cls.logger.critical('Датчики DALLAS не найдены. Завершение программы')
+                cls.logger.info(f'''Найдено устройство [{hex(device['vendor_id'])}:{hex(device['product_id'])}] ({device['path']})''')
+                devices.append(device)
+        if not devices:
+            cls.logger.critical('Подходящих устройств не найдено. Завершение программы.')
             sys.exit()
+        return devices
     
-    @classmethod
-    def clear_buffer(cls):
-        cls.USB_BUFO = [0]*9
-        cls.USB_BUFI = [0]*9
+    def search_sensors(self, FAMILY=None):
+        with self.lock:
+            self.TEMPERATURE_LOG = {}
+            self.sensors = []
+            RESULT = self.search_rom(FAMILY)
+            if RESULT:
+                self.logger.info("Найдено DALLAS - {} ({})".format(len(self.sensors), self.path))
+            else:
+                self.logger.error(f'Датчики DALLAS на шине {self.path} не найдены')
+            return RESULT
+
+    def discover_sensors(self, SENSORS):
+        with self.lock:
+            if not SENSORS:
+                self.search_sensors()
+            elif not self.probe_sensors(SENSORS):
+                return False
+            else:
+                self.sensors = list(self.probe_present)
+                for PREFIX, BITS in self.probe_branches:
+                    self.logger.debug(f'Шина {self.path}: поиск новых датчиков в ветви {PREFIX:#x} ({BITS} бит)')
+                    self.search_rom(PREFIX, BITS)
+            self.discovered = [ROM for ROM in self.sensors if ROM not in SENSORS]
+            self.missing = [ROM for ROM in SENSORS if ROM not in self.sensors]
+            return True
+
+    def locate_sensors(self, SENSORS):
+        with self.lock:
+            if not self.probe_sensors(SENSORS):
+                return self.search_sensors()
+            self.sensors = list(self.probe_present)
+            return True
+
+    def find_sensors(self):
+        with self.lock:
+            if not self.search_sensors():
+                self.logger.critical('Датчики DALLAS не найдены. Завершение программы')
+                sys.exit()
     
-    @classmethod
-    def get_feature(cls):
-        cls.USB_BUFI = cls.device.get_feature_report(0, 9)
+    def load_report(self, TEMPLATE):
+        self.USB_BUFO[:] = TEMPLATE
+
+    def get_feature(self):
+        self.USB_BUFI[:] = self.device.get_feature_report(0, 9)
         return True
 
-    @classmethod
-    def set_feature(cls):
-        cls.device.send_feature_report(cls.USB_BUFO)
+    def set_feature(self):
+        self.device.send_feature_report(self.USB_BUFO)
         return True
     
-    @classmethod
-    def error_in_method(cls, frame):
-        cls.logger.error(f"Ошибка метода {inspect.getframeinfo(frame).function}()")
-        cls.logger.error(f"USB_BUFO={cls.USB_BUFO}")
-        cls.logger.error(f"USB_BUFI={cls.USB_BUFI}")
+    def check_busy_reports(self):
+        with self.lock:
+            self.load_report(self.OW_READ_REPORTS[0x81])
+            self.set_feature()
+            self.wait_feature(10/1000)
+            self.load_report(self.OW_REPORTS[0x48])
+            self.set_feature()
+            self.get_feature()
+            self.stale_reports = self.USB_BUFI[1] != 0x00
+            self.wait_feature(10/1000)
+            if self.stale_reports:
+                self.logger.info(f'Адаптер {self.path} во время выполнения команды возвращает предыдущий ответ: для повторяющихся команд используются фиксированные задержки')
+
+    def wait_feature(self, delay):
+        REPEATED = self.stale_reports and self.USB_BUFO[1:3] == self.last_command
+        self.last_command = self.USB_BUFO[1:3]
+        if not self.completion_polling or REPEATED:
+            sleep(delay)
+            return self.get_feature()
+        deadline = monotonic() + self.POLL_TIMEOUT
+        pause = self.POLL_MIN_DELAY
+        poll = 0
+        while True:
+            self.get_feature()
+            if self.USB_BUFI[1] == self.USB_BUFO[1] and (self.USB_BUFO[1] != 0x18 or self.USB_BUFI[2] == self.USB_BUFO[2]):
+                return True
+            if monotonic() >= deadline:
+                self.logger.warning(f'Адаптер не завершил команду за {self.POLL_TIMEOUT * 1000:.0f} мс')
+                return False
+            poll += 1
+            if poll > self.POLL_SPIN_COUNT:
+                sleep(pause)
+                pause = min(pause * 2, self.POLL_MAX_DELAY)
+
+    def error_in_method(self, frame):
+        self.logger.error(f"Ошибка метода {inspect.getframeinfo(frame).function}()")
+        self.logger.error(f"USB_BUFO={list(self.USB_BUFO)}")
+        self.logger.error(f"USB_BUFI={list(self.USB_BUFI)}")
     
-    @classmethod
-    def ow_reset(cls):
-        cls.clear_buffer()
+    def ow_reset(self):
+        self.load_report(self.OW_REPORTS[0x48])
         RESULT = False
-        cls.USB_BUFO[1]=0x18
-        cls.USB_BUFO[2]=0x48
-        for TryCount in range(3):
-            if cls.set_feature():
-                sleep(10/1000) 
-                if cls.get_feature():
-                    RESULT = (cls.USB_BUFI[1] == 0x18) & (cls.USB_BUFI[2] == 0x48) & (cls.USB_BUFI[3] == 0x00)
+        self.no_presence = False
+        for TryCount in self.retry.tries():
+            self.bus_resets += 1
+            if self.set_feature():
+                if self.wait_feature(10/1000):
+                    RESULT = (self.USB_BUFI[1] == 0x18) & (self.USB_BUFI[2] == 0x48) & (self.USB_BUFI[3] == 0x00)
+                    self.no_presence = (self.USB_BUFI[1] == 0x18) & (self.USB_BUFI[2] == 0x48) & (self.USB_BUFI[3] != 0x00)
                     if RESULT:
                         break
         if not RESULT:
-            cls.error_in_method(inspect.currentframe())
+            self.error_in_method(inspect.currentframe())
         return RESULT
 
-    @classmethod
-    def ow_read_bit(cls):
+    def ow_read_bit(self):
         RESULT = False
-        cls.clear_buffer()
-        cls.USB_BUFO[1]=0x18
-        cls.USB_BUFO[2]=0x81
-        cls.USB_BUFO[3]=0x01
-        if cls.set_feature():
-            sleep(10/1000)
-            if cls.get_feature():
-                RESULT = (cls.USB_BUFI[1] == 0x18) & (cls.USB_BUFI[2] == 0x81)
-                cls.one_bit = cls.USB_BUFI[3] & 0x01
+        self.load_report(self.OW_READ_REPORTS[0x81])
+        if self.set_feature():
+            if self.wait_feature(10/1000):
+                RESULT = (self.USB_BUFI[1] == 0x18) & (self.USB_BUFI[2] == 0x81)
+                self.one_bit = self.USB_BUFI[3] & 0x01
         if not RESULT:
-            cls.error_in_method(inspect.currentframe())
+            self.error_in_method(inspect.currentframe())
         return RESULT
     
-    @classmethod
-    def ow_read_2bits(cls):
-        cls.clear_buffer()
-        cls.USB_BUFO[1]=0x18
-        cls.USB_BUFO[2]=0x82
-        cls.USB_BUFO[3]=0x01
-        cls.USB_BUFO[4]=0x01
-        if cls.set_feature():
-            sleep(2/1000)
-            if cls.get_feature():
-                RESULT = (cls.USB_BUFI[1] == 0x18) & (cls.USB_BUFI[2] == 0x82)
-                cls.two_bits = (cls.USB_BUFI[3] & 0x01) + ((cls.USB_BUFI[4] << 1) & 0x02)
-        if not RESULT:
-            cls.error_in_method(inspect.currentframe())
-        return RESULT
-        
-    @classmethod
-    def ow_read_byte(cls):
+    def ow_write_byte(self, B):
         RESULT = False
-        cls.clear_buffer()
-        cls.USB_BUFO[1]=0x18
-        cls.USB_BUFO[2]=0x88
-        cls.USB_BUFO[3]=0xFF
-        if cls.set_feature():
-            sleep(5/1000)
-            if cls.get_feature():
-                RESULT = (cls.USB_BUFI[1] == 0x18) & (cls.USB_BUFI[2] == 0x88)
-                cls.one_byte = cls.USB_BUFI[3]
+        self.load_report(self.OW_REPORTS[0x88])
+        self.USB_BUFO[3] = B
+        if self.set_feature():
+            if self.wait_feature(5/1000):
+                RESULT = (self.USB_BUFI[1] == 0x18) & (self.USB_BUFI[2] == 0x88) & (self.USB_BUFI[3] == B)
         if not RESULT:
-            cls.error_in_method(inspect.currentframe())
+            self.error_in_method(inspect.currentframe())
         return RESULT
 
-    @classmethod
-    def ow_read_4bytes(cls):
-        RESULT = False
-        cls.clear_buffer()
-        cls.USB_BUFO[1]=0x18
-        cls.USB_BUFO[2]=0x84
-        cls.USB_BUFO[3]=0xFF
-        cls.USB_BUFO[4]=0xFF
-        cls.USB_BUFO[5]=0xFF
-        cls.USB_BUFO[6]=0xFF
-        if cls.set_feature():
-            sleep(30/1000)
-            if cls.get_feature():
-                RESULT = (cls.USB_BUFI[1] == 0x18) & (cls.USB_BUFI[2] == 0x84)
-                cls.four_bytes = cls.USB_BUFI[3] + (cls.USB_BUFI[4] << 8) + (cls.USB_BUFI[5] << 16) + (cls.USB_BUFI[6] << 24)
+    def ow_transfer(self, DATA):
+        RESULT = True
+        SIZE = len(DATA)
+        if len(self.transfer_buffer) < SIZE:
+            self.transfer_buffer = bytearray(SIZE)
+            self.transfer_view = memoryview(self.transfer_buffer)
+        i = 0
+        while RESULT and i < SIZE:
+            COUNT = 4 if SIZE - i >= 4 else 1
+            self.load_report(self.OW_REPORTS[0x84 if COUNT == 4 else 0x88])
+            self.USB_BUFO[3:3 + COUNT] = DATA[i:i + COUNT]
+            RESULT = False
+            if self.set_feature():
+                if self.wait_feature(self.OW_TRANSFER_DELAYS[COUNT]):
+                    RESULT = (self.USB_BUFI[1] == 0x18) & (self.USB_BUFI[2] == self.USB_BUFO[2])
+                    for j in range(3, 3 + COUNT):
+                        B = self.USB_BUFO[j]
+                        if B != 0xFF:
+                            RESULT = RESULT & (self.USB_BUFI[j] == B)
+                        self.transfer_buffer[i + j - 3] = self.USB_BUFI[j]
+            i += COUNT
+        self.transfer_bytes = self.transfer_view[:SIZE]
         if not RESULT:
-            cls.error_in_method(inspect.currentframe())
-        return RESULT
-    
-    @classmethod
-    def ow_write_bit(cls, B):
-        RESULT = False
-        cls.clear_buffer()
-        cls.USB_BUFO[1] = 0x18
-        cls.USB_BUFO[2] = 0x81
-        cls.USB_BUFO[3] = B & 0x01
-        if cls.set_feature():
-            sleep(5/1000)
-            if cls.get_feature():
-                RESULT = (cls.USB_BUFI[1] == 0x18) & (cls.USB_BUFI[2] == 0x81) & ((cls.USB_BUFI[3] & 0x01) == (B & 0x01))
-        if not RESULT:
-            cls.error_in_method(inspect.currentframe())
-        return RESULT
-    
-    @classmethod
-    def ow_write_byte(cls, B):
-        RESULT = False
-        cls.clear_buffer()
-        cls.USB_BUFO[1] = 0x18
-        cls.USB_BUFO[2] = 0x88
-        cls.USB_BUFO[3] = B
-        if cls.set_feature():
-            sleep(5/1000)
-            if cls.get_feature():
-                RESULT = (cls.USB_BUFI[1] == 0x18) & (cls.USB_BUFI[2] == 0x88) & (cls.USB_BUFI[3] == B)
-        if not RESULT:
-            cls.error_in_method(inspect.currentframe())
+            self.error_in_method(inspect.currentframe())
         return RESULT
 
-    @classmethod
-    def ow_write_4bytes(cls, B):
+    def ow_slots(self, BITS):
         RESULT = False
-        D0 = B & 0xFF
-        D1 = (B >> 8) & 0xFF
-        D2 = (B >> 16) & 0xFF
-        D3 = (B >> 24) & 0xFF
-        cls.clear_buffer()
-        cls.USB_BUFO[1] =0x18
-        cls.USB_BUFO[2] =0x84
-        cls.USB_BUFO[3] = D0
-        cls.USB_BUFO[4] = D1
-        cls.USB_BUFO[5] = D2
-        cls.USB_BUFO[6] = D3
-        if cls.set_feature():
-            sleep(30/1000)
-            if cls.get_feature():
-                RESULT = (cls.USB_BUFI[1]==0x18) & (cls.USB_BUFI[2] == 0x84) & (cls.USB_BUFI[3] == D0) & (cls.USB_BUFI[4] == D1) & (cls.USB_BUFI[5] == D2) & (cls.USB_BUFI[6] == D3)
+        for SIZE, COMMAND, DELAY in self.OW_SLOT_COMMANDS:
+            if len(BITS) >= SIZE:
+                break
+        BITS = BITS[:SIZE]
+        self.load_report(self.OW_REPORTS[COMMAND])
+        if SIZE <= 2:
+            for j in range(SIZE):
+                self.USB_BUFO[3 + j] = BITS[j] & 0x01
+        else:
+            for j in range(SIZE):
+                self.USB_BUFO[3 + j // 8] |= (BITS[j] & 0x01) << (j % 8)
+        if self.set_feature():
+            if self.wait_feature(DELAY):
+                RESULT = (self.USB_BUFI[1] == 0x18) & (self.USB_BUFI[2] == COMMAND)
+                if SIZE <= 2:
+                    self.slot_bits = [self.USB_BUFI[3 + j] & 0x01 for j in range(SIZE)]
+                else:
+                    self.slot_bits = [(self.USB_BUFI[3 + j // 8] >> (j % 8)) & 0x01 for j in range(SIZE)]
         if not RESULT:
-            cls.error_in_method(inspect.currentframe())
+            self.error_in_method(inspect.currentframe())
         return RESULT
+
+    def crc8(self, CRC, D):
+        return self.CRC8_TABLE[CRC ^ D]
+
+    def crc8_block(self, DATA, CRC=0):
+        TABLE = self.CRC8_TABLE
+        for D in DATA:
+            CRC = TABLE[CRC ^ D]
+        return CRC
+
+    def decode_temperature(self, FAMILY, DATA):
+        K = DATA[0] | (DATA[1] << 8)
+        if K & 0x8000:
+            K -= 0x10000
+        if FAMILY == 0x28 or FAMILY == 0x22:
+            return (K & self.RESOLUTION_MASKS[(DATA[4] >> 5) & 0x03]) * 0.0625
+        elif FAMILY == 0x10:
+            return K * 0.5
+        return 1000
     
-    @classmethod
-    def crc8(cls, CRC, D):
-        R = CRC
-        for i in range(8):
-            if (R ^ (D >> i)) & 0x01 == 0x01:
-                R = ((R ^ 0x18) >> 1) | 0x80
-            else:
-                R = (R >> 1) & 0x7F
-        return R
+    def prepare_payloads(self, ROMS):
+        for ROM in ROMS:
+            MATCH_ROM = bytes((0x55,)) + ROM.to_bytes(8, 'little')
+            self.match_rom_payloads[ROM] = MATCH_ROM
+            self.read_scratchpad_payloads[ROM] = MATCH_ROM + bytes((0xBE,)) + bytes((0xFF,)) * 10
+
+    def match_rom(self, ROM):
+        with self.lock:
+            RESULT = False
+            if ROM not in self.match_rom_payloads:
+                self.prepare_payloads((ROM,))
+            for TryCount in self.retry.tries():
+                if self.ow_reset():
+                    RESULT = self.ow_transfer(self.match_rom_payloads[ROM])
+                    if RESULT:
+                        break
+            if not RESULT:
+                self.error_in_method(inspect.currentframe())
+            return RESULT
     
-    @classmethod
-    def match_rom(cls, ROM):
-        RESULT = False
-        for TryCount in range(3):
-            if cls.ow_reset():
-                if cls.ow_write_byte(0x55):
-                    if cls.ow_write_4bytes(ROM & 0xFFFFFFFF):
-                        RESULT = cls.ow_write_4bytes((ROM >> 32) & 0xFFFFFFFF)
-                        if RESULT:
-                            break
-        if not RESULT:
-            cls.error_in_method(inspect.currentframe())
-        return RESULT
+    def skip_rom(self):
+        with self.lock:
+            RESULT = False
+            for TryCount in self.retry.tries():
+                if self.ow_reset():
+                    RESULT = self.ow_write_byte(0xCC)
+                    if RESULT:
+                        break
+            if not RESULT:
+                self.error_in_method(inspect.currentframe())
+            return RESULT
     
-    @classmethod
-    def skip_rom(cls):
+    def search_pass(self, ROM, LAST_DISCREPANCY, KNOWN, COMMAND=0xF0):
         RESULT = False
-        for TryCount in range(3):
-            if cls.ow_reset():
-                RESULT = cls.ow_write_byte(0xCC)
-                if RESULT:
+        LAST_ZERO = -1
+        DISCREPANCIES = 0
+        self.search_mismatch = False
+        self.search_empty = False
+        if self.ow_reset():
+            RESULT = self.ow_write_byte(COMMAND)
+        else:
+            self.search_empty = self.no_presence
+        PLAN = []
+        for i in range(KNOWN):
+            PLAN += [1, 1, 1 if i == LAST_DISCREPANCY else (ROM >> i) & 0x01]
+        PLAN += [1, 1]
+        NEXT_BIT = KNOWN
+        SLOTS = []
+        CHECKED = 0
+        while RESULT and len(SLOTS) < len(PLAN):
+            RESULT = self.ow_slots(PLAN[len(SLOTS):])
+            if not RESULT:
+                break
+            SLOTS += self.slot_bits
+            while NEXT_BIT < 64 and len(SLOTS) > 3 * NEXT_BIT:
+                PLAN.append(SLOTS[3 * NEXT_BIT])
+                NEXT_BIT += 1
+                if NEXT_BIT < 64:
+                    PLAN += [1, 1]
+            while CHECKED < 64 and len(SLOTS) > 3 * CHECKED + 1:
+                ID_BIT, CMP_BIT, BIT = SLOTS[3 * CHECKED], SLOTS[3 * CHECKED + 1], PLAN[3 * CHECKED + 2]
+                if ID_BIT == 1 and CMP_BIT == 1:
+                    self.search_empty = True
+                    RESULT = False
+                elif ID_BIT != CMP_BIT and BIT != ID_BIT:
+                    self.search_mismatch = True
+                    RESULT = False
+                elif ID_BIT == 0 and CMP_BIT == 0:
+                    DISCREPANCIES |= 1 << CHECKED
+                    if BIT == 0:
+                        LAST_ZERO = CHECKED
+                if not RESULT:
                     break
-        if not RESULT:
-            cls.error_in_method(inspect.currentframe())
+                ROM = (ROM & ~(1 << CHECKED)) | (BIT << CHECKED)
+                CHECKED += 1
+        if RESULT:
+            RESULT = self.crc8_block(ROM.to_bytes(8, 'little')) == 0 and ROM != 0
+        self.search_result = ROM
+        self.search_discrepancy = LAST_ZERO
+        self.search_checked = CHECKED
+        self.search_discrepancies = DISCREPANCIES
         return RESULT
-    
-    @classmethod
-    def search_rom(cls, ROM_NEXT, PL):
-        RESULT = False
-        CL = [False] * 64
-        RL = [0] * 64
-        B1 = 1
-        for TryCount in range(3):
-            ROM = 0
-            if (cls.ow_reset()):
-                RESULT = cls.ow_write_byte(0xF0)
-            if RESULT:
-                for i in range(64):
-                    if RESULT:
-                        if cls.ow_read_2bits():
-                            if cls.two_bits&0x03 == 0:
-                                if PL < i:
-                                    CL[i] = True
-                                    RL[i] = ROM
-                                if PL >= i:
-                                    BIT = (ROM_NEXT >> i) & 0x01
-                                else:
-                                    BIT = 0
-                                if not cls.ow_write_bit(BIT):
-                                    RESULT = False
-                                    break
-                                if BIT == 1:
-                                    ROM = ROM + (B1 << i)
-                            elif cls.two_bits&0x03 == 1:
-                                if not cls.ow_write_bit(0x01):
-                                    RESULT = False
-                                    break
-                                else:
-                                    ROM = ROM + (B1 << i)
-                            elif cls.two_bits&0x03 == 2:
-                                if not cls.ow_write_bit(0x00):
-                                    RESULT = False
-                                    break
-                            elif cls.two_bits&0x03 == 3:
-                                RESULT = False
-                                break
-                            else: break
-            if ROM == 0:
+
+    def search_rom(self, PREFIX=None, BITS=8):
+        with self.lock:
+            RESULT = False
+            if PREFIX is None:
+                ROM, LAST_DISCREPANCY, KNOWN = 0, -1, 0
+            else:
+                ROM, LAST_DISCREPANCY, KNOWN = PREFIX, 64, BITS
+            TARGETED = PREFIX is not None
+            while True:
+                PASS_RESULT = False
+                for TryCount in self.retry.tries():
+                    PASS_RESULT = self.search_pass(ROM, LAST_DISCREPANCY, KNOWN)
+                    if PASS_RESULT or (TARGETED and self.search_mismatch):
+                        break
+                if not PASS_RESULT:
+                    if not (TARGETED and self.search_mismatch):
+                        self.error_in_method(inspect.currentframe())
+                    break
+                TARGETED = False
+                ROM, LAST_DISCREPANCY = self.search_result, self.search_discrepancy
+                KNOWN = LAST_DISCREPANCY + 1
+                if PREFIX is not None and (ROM ^ PREFIX) & ((1 << BITS) - 1):
+                    break
+                if ROM not in self.sensors:
+                    self.sensors.append(ROM)
+                RESULT = True
+                if LAST_DISCREPANCY < 0:
+                    break
+            return RESULT
+
+    def probe_sensors(self, SENSORS):
+        with self.lock:
+            self.probe_present = []
+            self.probe_branches = []
+            for ROM in SENSORS:
                 RESULT = False
-                
-            if RESULT:
-                CRC = 0
-                for j in range(8):
-                    CRC = cls.crc8(CRC, (ROM >> (j*8)) & 0xFF)
-                RESULT = CRC == 0
+                self.search_mismatch = self.search_empty = self.no_presence = False
+                for TryCount in self.retry.tries():
+                    RESULT = self.search_pass(ROM, -1, 64)
+                    if RESULT or self.search_mismatch or self.search_empty:
+                        break
+                if not (RESULT or self.search_mismatch or self.search_empty):
+                    self.error_in_method(inspect.currentframe())
+                    return False
+                if self.no_presence:
+                    self.logger.warning(f'Шина {self.path}: нет ответа присутствия, датчики на шине отсутствуют')
+                    break
+                if RESULT:
+                    self.probe_present.append(ROM)
+                BRANCHES = self.search_discrepancies | (1 << self.search_checked if self.search_mismatch else 0)
+                for BIT in range(64):
+                    if not (BRANCHES >> BIT) & 0x01:
+                        continue
+                    PREFIX = (ROM ^ (1 << BIT)) & ((2 << BIT) - 1)
+                    if not any((SENSOR ^ PREFIX) & ((2 << BIT) - 1) == 0 for SENSOR in SENSORS) and (PREFIX, BIT + 1) not in self.probe_branches:
+                        self.probe_branches.append((PREFIX, BIT + 1))
+            return True
 
-        if not RESULT:
-            cls.error_in_method(inspect.currentframe())
-        else:
-            cls.sensors.append(ROM)
-        
-        for i in range(64):
-            if CL[i]:
-                cls.search_rom(RL[i] | (B1 << i), i)
-        
-        return RESULT        
+    def read_rom(self):
+        with self.lock:
+            RESULT = False
+            if self.ow_reset():
+                RESULT = self.ow_transfer(self.READ_ROM_PAYLOAD)
+                if RESULT:
+                    self.rom_result = int.from_bytes(self.transfer_bytes[1:9], 'little')
+                    RESULT = self.crc8_block(self.transfer_bytes[1:9]) == 0 and self.rom_result != 0
+            return RESULT
 
-    @classmethod
-    def skip_rom_convert(cls):
-        RESULT = False
-        for TryCount in range(3):
-            if (cls.ow_reset()):
-                if (cls.ow_write_byte(0xCC)):
-                    RESULT = cls.ow_write_byte(0x44)
-                    if RESULT: break
-        if not RESULT:
-            cls.logger.error('Ошибка SKIP_ROM_CONVERT')
-        return RESULT
+    def enable_single_drop(self, ROM):
+        with self.lock:
+            self.single_drop = None
+            if self.read_rom() and self.rom_result == ROM:
+                self.single_drop = ROM
+                self.single_drop_reads = 0
+                self.logger.info(f'На шине {self.path} один датчик: считывание без адресации (SKIP ROM)')
+            return self.single_drop is not None
+
+    def check_single_drop(self):
+        with self.lock:
+            if self.single_drop is not None and not (self.read_rom() and self.rom_result == self.single_drop):
+                self.logger.warning(f'Состав датчиков на шине {self.path} изменился: переход на адресацию датчиков (MATCH ROM)')
+                self.single_drop = None
+                self.sensors = []
+            return self.single_drop is not None
+
+    def alarm_search(self, SENSORS):
+        with self.lock:
+            self.alarm_sensors = []
+            CANDIDATES = list(SENSORS)
+            while CANDIDATES:
+                ROM = CANDIDATES.pop(0)
+                RESULT = False
+                self.search_mismatch = self.search_empty = False
+                for TryCount in self.retry.tries():
+                    RESULT = self.search_pass(ROM, -1, 64, 0xEC)
+                    if RESULT or self.search_mismatch or self.search_empty:
+                        break
+                if RESULT:
+                    self.alarm_sensors.append(ROM)
+                    continue
+                if not (self.search_mismatch or self.search_empty):
+                    self.error_in_method(inspect.currentframe())
+                    return False
+                MASK = (2 << self.search_checked) - 1 if self.search_mismatch else (1 << self.search_checked) - 1
+                CANDIDATES = [SENSOR for SENSOR in CANDIDATES if (SENSOR ^ ROM) & MASK]
+            return True
+
+    def skip_rom_convert(self):
+        with self.lock:
+            RESULT = False
+            for TryCount in self.retry.tries():
+                if (self.ow_reset()):
+                    if (self.ow_write_byte(0xCC)):
+                        RESULT = self.ow_write_byte(0x44)
+                        if RESULT: break
+            if not RESULT:
+                self.logger.error('Ошибка SKIP_ROM_CONVERT')
+            else:
+                self.conversion_start = monotonic()
+                self.conversion_resets = self.bus_resets
+            self.conversion_pending = RESULT
+            return RESULT
+
+    def wait_conversion(self, level):
+        with self.lock:
+            self.conversion_pending = False
+            LIMIT = self.conversion_start + self.CONVERSION_TIMES[level]
+            RESULT = False
+            if not self.parasite_power and self.bus_resets == self.conversion_resets:
+                while monotonic() < LIMIT:
+                    if not self.ow_read_bit():
+                        break
+                    if self.one_bit:
+                        RESULT = True
+                        break
+                    sleep(self.CONVERSION_POLL_DELAY)
+            if not RESULT:
+                delay = LIMIT - monotonic()
+                if delay > 0:
+                    sleep(delay)
+            self.logger.debug(f'Ожидание преобразования температуры: {(monotonic() - self.conversion_start) * 1000:.1f} мс')
+            return RESULT
+
+    def read_power_supply(self):
+        with self.lock:
+            RESULT = self.skip_rom() and self.ow_write_byte(0xB4) and self.ow_read_bit()
+            if RESULT:
+                self.parasite_power = self.one_bit == 0
+                if self.parasite_power:
+                    self.logger.info('На шине есть датчики с паразитным питанием. Ожидание преобразования температуры по максимальному времени.')
+            else:
+                self.logger.error('Ошибка определения типа питания датчиков.')
+            return RESULT
     
-    @classmethod
-    def get_temperature(cls, ROM):
-        RESULT = False
-        FAMILY = ROM & 0xFF
-        for TryCount in range(3):
-            if cls.match_rom(ROM):
-                if cls.ow_write_byte(0xBE):
-                    if cls.ow_read_4bytes():
-                        L1 = int(cls.four_bytes)
-                        if cls.ow_read_4bytes():
-                            L2 = int(cls.four_bytes)
-                            if cls.ow_read_byte():
-                                L3 = int(cls.one_byte)
-                                CRC = 0
-                                for i in range(4):
-                                    CRC = cls.crc8(CRC, (L1 >> (i * 8)) & 0xFF)
-                                for i in range(4):
-                                    CRC = cls.crc8(CRC, (L2 >> (i * 8)) & 0xFF)
-                                CRC = cls.crc8(CRC, L3)
-                                RESULT = CRC == 0 
-                                K = L1 & 0xFFFF
-                                T = 1000
-                                if FAMILY == 0x28 or FAMILY == 0x22:
-                                    T = K * 0.0625
-                                elif FAMILY == 0x10:
-                                    T = K * 0.5
-                                cls.TEMPERATURE_LOG[ROM] = T
-                                if RESULT:
-                                    break
-        if not RESULT:
-            cls.error_in_method(inspect.currentframe())
-            cls.logger.error(f'Ошибка считывания с датчика: {ROM}')
-        return RESULT 
+    def read_scratchpad(self, ROM):
+        with self.lock:
+            RESULT = False
+            if ROM == self.single_drop:
+                PAYLOAD, OFFSET = self.SKIP_ROM_READ_SCRATCHPAD, 2
+            else:
+                if ROM not in self.read_scratchpad_payloads:
+                    self.prepare_payloads((ROM,))
+                PAYLOAD, OFFSET = self.read_scratchpad_payloads[ROM], 10
+            if self.ow_reset():
+                RESULT = self.ow_transfer(PAYLOAD)
+                if RESULT:
+                    self.scratchpad = self.transfer_bytes[OFFSET:OFFSET + 9]
+            if not RESULT:
+                self.error_in_method(inspect.currentframe())
+            return RESULT
+
+    def get_temperature(self, ROM):
+        with self.lock:
+            RESULT = False
+            FAMILY = ROM & 0xFF
+            self.retry.start_sensor()
+            if ROM == self.single_drop:
+                self.single_drop_reads += 1
+                if self.single_drop_reads >= self.SINGLE_DROP_CHECK_PERIOD:
+                    self.single_drop_reads = 0
+                    self.check_single_drop()
+            for TryCount in self.retry.tries():
+                if self.read_scratchpad(ROM):
+                    RESULT = self.crc8_block(self.scratchpad) == 0
+                    self.TEMPERATURE_LOG[ROM] = self.decode_temperature(FAMILY, self.scratchpad)
+                    if not RESULT and ROM == self.single_drop:
+                        self.check_single_drop()
+                    if RESULT:
+                        break
+            if not RESULT:
+                self.error_in_method(inspect.currentframe())
+                self.logger.error(f'Ошибка считывания с датчика: {ROM}')
+            self.retry.stop_sensor()
+            return RESULT 
     
-    @classmethod
-    def set_temperature_currency(cls, level):
-        RESULT = cls.skip_rom() and cls.ow_write_byte(0x4e) and cls.ow_write_byte(0x00) and cls.ow_write_byte(0xff)
-        RESULT = RESULT and cls.ow_write_byte(cls.CURRENCY_LEVELS[level])
-        RESULT = RESULT and cls.skip_rom()
-        RESULT = RESULT and cls.ow_write_byte(0x48)
+    def registers_match(self, REGISTERS):
+        return self.scratchpad[2] == REGISTERS[0] and self.scratchpad[3] == REGISTERS[1] and (len(REGISTERS) < 3 or self.scratchpad[4] & 0x60 == REGISTERS[2] & 0x60)
 
-        if RESULT:
-            cls.logger.info(f'Для всех датчиков установлен уровень точности измерения температуры: {level}')
+    def check_registers(self, ROM, level=None, TH=None, TL=None, copy=True):
+        with self.lock:
+            RESULT = False
+            for TryCount in self.retry.tries():
+                RESULT = self.read_scratchpad(ROM) and self.crc8_block(self.scratchpad) == 0
+                if RESULT:
+                    break
+            if not RESULT:
+                self.logger.error(f'Ошибка чтения регистра конфигурации датчика: {ROM}')
+                return RESULT
+            REGISTERS = (self.scratchpad[2] if TH is None else TH & 0xFF, self.scratchpad[3] if TL is None else TL & 0xFF)
+            if (ROM & 0xFF) != 0x10:
+                REGISTERS += (self.scratchpad[4] if level is None else self.CURRENCY_LEVELS[level] | 0x1F,)
+            if self.registers_match(REGISTERS):
+                return RESULT
+            RESULT = self.match_rom(ROM) and self.ow_transfer(bytes((0x4E,) + REGISTERS))
+            if copy:
+                RESULT = RESULT and self.match_rom(ROM) and self.ow_write_byte(0x48)
+            if RESULT:
+                if copy:
+                    sleep(self.EEPROM_COPY_TIME)
+                RESULT = self.read_scratchpad(ROM) and self.crc8_block(self.scratchpad) == 0
+                RESULT = RESULT and self.registers_match(REGISTERS)
+            if RESULT and level is not None:
+                self.logger.info(f'Для датчика {ROM} установлен уровень точности измерения температуры: {level}')
+            if RESULT and (TH is not None or TL is not None):
+                self.logger.info(f'Для датчика {ROM} установлены пороги сигнализации: TH={TH}, TL={TL}')
+            if not RESULT:
+                self.logger.error(f'Ошибка записи регистров датчика: {ROM}')
+            return RESULT
+
+    def set_temperature_currency(self, levels, copy=True):
+        with self.lock:
+            verified = {}
+            for ROM, level in levels.items():
+                if (ROM & 0xFF) == 0x10 or self.check_registers(ROM, level, copy=copy):
+                    verified[ROM] = level
+            return verified
+
+    def set_alarm_thresholds(self, thresholds):
+        with self.lock:
+            verified = {}
+            for ROM, (TH, TL) in thresholds.items():
+                if self.check_registers(ROM, TH=TH, TL=TL):
+                    verified[ROM] = [TH, TL]
+            return verified
+
+class SensorHealth:
+    HEALTHY = 'healthy'
+    DEGRADED = 'degraded'
+    QUARANTINED = 'quarantined'
+    PROBING = 'probing'
+
+    def __init__(self, rom, degraded_after=1, quarantine_after=3, probe_period=60, recover_after=1):
+        self.rom = rom
+        self.degraded_after = degraded_after
+        self.quarantine_after = quarantine_after
+        self.probe_period = probe_period
+        self.recover_after = recover_after
+        self.state = self.HEALTHY
+        self.failures = 0
+        self.successes = 0
+        self.next_probe = 0
+        self.value = None
+
+    def due(self, now):
+        if self.state == self.QUARANTINED and now >= self.next_probe:
+            self.state = self.PROBING
+            self.successes = 0
+        return self.state != self.QUARANTINED
+
+    def update(self, result, value, now):
+        state = self.state
+        if result:
+            self.failures = 0
+            self.successes += 1
+            self.value = value
+            if self.state == self.DEGRADED or (self.state == self.PROBING and self.successes >= self.recover_after):
+                self.state = self.HEALTHY
         else:
-            cls.logger.error(f'Ошибка установки уровня точности измерения температуры.')
+            self.successes = 0
+            self.failures += 1
+            if self.state == self.PROBING or self.failures >= self.quarantine_after:
+                self.state = self.QUARANTINED
+                self.next_probe = now + self.probe_period
+            elif self.failures >= self.degraded_after:
+                self.state = self.DEGRADED
+        return self.state != state
 
+    def reading(self):
+        if self.state in (self.QUARANTINED, self.PROBING) or self.value is None:
+            return float('nan')
+        return self.value
 
-        return RESULT
+class Scheduler:
+    LATENCY_WINDOW = 1000
+    STATS_PERIOD = 100
+
+    def __init__(self, period, start=None):
+        self.period = period
+        self.next_tick = monotonic() if start is None else start
+        self.ticks = 0
+        self.missed = 0
+        self.overruns = 0
+        self.latencies = deque(maxlen=self.LATENCY_WINDOW)
+
+    def wait(self):
+        delay = self.next_tick - monotonic()
+        if delay > 0:
+            sleep(delay)
+        return self.next_tick
+
+    def deadline(self):
+        return self.next_tick + self.period
+
+    def complete(self, start_time):
+        now = monotonic()
+        self.ticks += 1
+        self.latencies.append(now - start_time)
+        self.next_tick = start_time + self.period
+        missed = 0
+        if now > self.next_tick:
+            self.overruns += 1
+            missed = int((now - self.next_tick) // self.period) + 1
+            self.missed += missed
+            self.next_tick += missed * self.period
+        return missed
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0
+        values = sorted(self.latencies)
+        return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+    def stats(self):
+        return dict(ticks=self.ticks, missed=self.missed, overruns=self.overruns, p50=self.percentile(50), p90=self.percentile(90), p99=self.percentile(99), max=max(self.latencies, default=0))
+
+class AdaptiveInterval:
+    def __init__(self, rom, interval, deadband=0.25, rate_threshold=0.05, min_interval=1, max_interval=60, growth=2, **options):
+        self.rom = rom
+        self.deadband = deadband
+        self.rate_threshold = rate_threshold
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.growth = max(growth, 1)
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+        self.anchor = None
+        self.last_value = None
+        self.last_time = None
+
+    def update(self, value, now):
+        interval = self.interval
+        if self.last_time is not None and now > self.last_time and abs(value - self.last_value) / (now - self.last_time) > self.rate_threshold:
+            self.interval = self.min_interval
+            self.anchor = value
+        elif self.anchor is None or abs(value - self.anchor) > self.deadband:
+            self.anchor = value
+        else:
+            self.interval = min(self.interval * self.growth, self.max_interval)
+        self.last_value = value
+        self.last_time = now
+        return self.interval != interval
+
+    def idle(self):
+        return self.interval >= self.max_interval
 
 class TemperatureScanner:
-    def __init__(self):
+    SHED_MARGIN = 50/1000
+
+    def __init__(self, sessions):
         self.logger = Logger(self.__class__.__name__)
-        RODOS_HID.set_temperature_currency(Config.TEMP_CURRENCY)
+        self.sessions = sessions
+        self.TEMPERATURE_LOG = {}
+        self.conversion_levels = {}
+        self.cycle_deadline = None
+        self.read_times = {}
+        self.deferred = set()
+        self.next_due = {}
+        self.last_due = {}
+        self.adaptive = {}
+        if Config.ADAPTIVE_SAMPLING['enabled']:
+            self.adaptive = {sensor: AdaptiveInterval(sensor, Config.get_sensor_interval(sensor), **Config.ADAPTIVE_SAMPLING) for sensor in Config.SENSOR_LIST}
+        self.pending_sensors = {}
+        self.next_sweep = {}
+        self.armed = set()
+        self.next_discovery = monotonic() + Config.SENSOR_DISCOVERY['period']
+        self.missing = set()
+        self.fresh = {}
+        self.read_stamps = {}
+        self.history = self.open_history()
+        self.latest = self.open_latest()
+        self.columns = self.open_columns()
+        self.health = {sensor: SensorHealth(sensor, **Config.SENSOR_HEALTH) for sensor in Config.SENSOR_LIST}
+        self.executor = ThreadPoolExecutor(max_workers=len(self.sessions)) if len(self.sessions) > 1 else None
+        self.assign_sensors()
+        self.set_temperature_currency()
+        self.restore_adaptive_currency()
+        self.set_conversion_levels()
+        self.set_alarm_thresholds()
 
     def analyse_config(self):
         for logging_destination in self.CONFIG_FILE['loggers']:
             if self.logger.check_destination_availibility(logging_destination[0]):
                 self.logger.add_file_handler(logging_destination[0], self.logger.check_log_level(logging_destination[1]))
-    
-    def get_temperature(self):
-        RODOS_HID.skip_rom_convert()
-        for sensor in Config.SENSOR_LIST:#self.CONFIG_FILE['sensor_list']:
-            RODOS_HID.get_temperature(sensor)
-        self.logger.info(' '.join((f'{key}={RODOS_HID.TEMPERATURE_LOG[key]}'for key in RODOS_HID.TEMPERATURE_LOG.keys())))
+
+    def assign_sensors(self):
+        if len(self.sessions) == 1:
+            self.buses = [(self.sessions[0], list(Config.SENSOR_LIST))]
+        else:
+            self.run_on_buses(lambda session, sensors: session.sensors or session.locate_sensors(Config.SENSOR_LIST), [(session, []) for session in self.sessions])
+            self.buses = [(session, [sensor for sensor in Config.SENSOR_LIST if sensor in session.sensors]) for session in self.sessions]
+            missing = [sensor for sensor in Config.SENSOR_LIST if not any(sensor in session.sensors for session in self.sessions)]
+            for sensor in missing:
+                self.logger.critical(f'Датчик {sensor} не найден ни на одной шине')
+            if missing:
+                self.buses[0][1].extend(missing)
+            for session, sensors in self.buses:
+                self.logger.info(f'Шина {session.path}: датчиков {len(sensors)}')
+        self.prepare_buses()
+
+    def prepare_buses(self):
+        for session, sensors in self.buses:
+            session.prepare_payloads(sensors)
+            if len(sensors) == 1:
+                session.enable_single_drop(sensors[0])
+            else:
+                session.single_drop = None
+
+    def discover_sensors(self):
+        results = self.run_on_buses(lambda session, sensors: session.discover_sensors(sensors))
+        for (session, sensors), result in zip(self.buses, results):
+            if not result:
+                self.logger.warning(f'Шина {session.path}: ошибка проверки состава датчиков, изменения на этой шине не применены')
+        checked = [(session, sensors) for (session, sensors), result in zip(self.buses, results) if result]
+        unchecked = [sensor for (session, sensors), result in zip(self.buses, results) if not result for sensor in sensors]
+        known = [sensor for session, sensors in self.buses for sensor in sensors]
+        found = [sensor for session, sensors in checked for sensor in session.sensors]
+        added = [sensor for sensor in found if sensor not in known]
+        missing = {sensor for session, sensors in checked for sensor in sensors if sensor not in found}
+        removed = [sensor for sensor in known if sensor in missing - self.missing]
+        self.missing = missing | (self.missing & set(unchecked))
+        if not added and not removed:
+            self.logger.debug('Состав датчиков не изменился')
+            return
+        Config.apply_discovery(added, removed)
+        self.buses = [(session, [sensor for sensor in Config.SENSOR_LIST if (sensor in session.sensors and result) or (sensor in sensors and (sensor in missing or not result))]) for (session, sensors), result in zip(self.buses, results)]
+        for sensor in Config.SENSOR_LIST:
+            if sensor not in self.health:
+                self.health[sensor] = SensorHealth(sensor, **Config.SENSOR_HEALTH)
+            if Config.ADAPTIVE_SAMPLING['enabled'] and sensor not in self.adaptive:
+                self.adaptive[sensor] = AdaptiveInterval(sensor, Config.get_sensor_interval(sensor), **Config.ADAPTIVE_SAMPLING)
+        self.prepare_buses()
+        self.set_temperature_currency()
+        self.set_conversion_levels()
+        self.set_alarm_thresholds()
+
+    def check_discovery(self):
+        if not Config.SENSOR_DISCOVERY['period'] or monotonic() < self.next_discovery:
+            return
+        self.next_discovery = monotonic() + Config.SENSOR_DISCOVERY['period']
+        self.discover_sensors()
+
+    def sensor_currency(self, sensor):
+        if (sensor & 0xFF) == 0x10:
+            return 3
+        return Config.get_sensor_currency(sensor)
+
+    def set_temperature_currency(self):
+        buses = [(session, {sensor: self.sensor_currency(sensor) for sensor in sensors if Config.VERIFIED_CURRENCY.get(sensor) != self.sensor_currency(sensor)}) for session, sensors in self.buses]
+        if not any(levels for session, levels in buses):
+            self.logger.debug('Уровень точности измерения температуры всех датчиков уже проверен')
+            return
+        results = self.run_on_buses(lambda session, levels: session.set_temperature_currency(levels), buses)
+        Config.update_verified_currency({sensor: level for verified in results for sensor, level in verified.items()})
+
+    def restore_adaptive_currency(self):
+        if not self.adaptive or not Config.ADAPTIVE_SAMPLING['adapt_currency']:
+            return
+        buses = [(session, {sensor: self.sensor_currency(sensor) for sensor in sensors if sensor in self.adaptive and (sensor & 0xFF) != 0x10 and Config.VERIFIED_CURRENCY.get(sensor) == self.sensor_currency(sensor)}) for session, sensors in self.buses]
+        results = self.run_on_buses(lambda session, levels: session.set_temperature_currency(levels, copy=False), buses)
+        failed = [sensor for (session, levels), verified in zip(buses, results) for sensor in levels if sensor not in verified]
+        for sensor in failed:
+            self.logger.warning(f'Датчик {sensor}: не удалось восстановить уровень точности после адаптивного снижения')
+        Config.discard_verified_currency(failed)
+
+    def set_conversion_levels(self):
+        for session, sensors in self.buses:
+            for sensor in sensors:
+                self.conversion_levels[sensor] = self.sensor_currency(sensor) if Config.VERIFIED_CURRENCY.get(sensor) == self.sensor_currency(sensor) else 3
+            self.logger.debug(f'Шина {session.path}: ожидание преобразования температуры {session.CONVERSION_TIMES[self.conversion_level(sensors)] * 1000:.2f} мс')
+
+    def alarm_thresholds(self, sensor):
+        if Config.get_sensor_alarm(sensor) or not Config.ALARM_MONITORING['enabled']:
+            return Config.get_sensor_alarm(sensor)
+        return [125, -55]
+
+    def set_alarm_thresholds(self):
+        buses = [(session, {sensor: self.alarm_thresholds(sensor) for sensor in sensors if self.alarm_thresholds(sensor) and Config.VERIFIED_ALARMS.get(sensor) != self.alarm_thresholds(sensor)}) for session, sensors in self.buses]
+        if any(thresholds for session, thresholds in buses):
+            results = self.run_on_buses(lambda session, thresholds: session.set_alarm_thresholds(thresholds), buses)
+            Config.update_verified_alarms({sensor: thresholds for verified in results for sensor, thresholds in verified.items()})
+        self.armed = {sensor for sensor in Config.SENSOR_LIST if Config.get_sensor_alarm(sensor) and Config.VERIFIED_ALARMS.get(sensor) == Config.get_sensor_alarm(sensor)}
+        if Config.ALARM_MONITORING['enabled']:
+            self.logger.info(f'Контроль тревоги: датчиков с порогами сигнализации {len(self.armed)} из {len(Config.SENSOR_LIST)}')
+
+    def alarm_filter(self, session, sensors):
+        if not Config.ALARM_MONITORING['enabled'] or not sensors:
+            return sensors
+        now = monotonic()
+        if now >= self.next_sweep.get(session, 0):
+            self.next_sweep[session] = now + Config.ALARM_MONITORING['sweep_period']
+            return sensors
+        if not session.alarm_search([sensor for sensor in sensors if sensor in self.armed]):
+            self.logger.warning(f'Шина {session.path}: ошибка поиска датчиков в состоянии тревоги, считываются все датчики')
+            return sensors
+        for sensor in session.alarm_sensors:
+            if sensor in self.armed:
+                self.logger.warning(f'Датчик {sensor}: температура вне порогов сигнализации')
+        return [sensor for sensor in sensors if sensor not in self.armed or sensor in session.alarm_sensors]
+
+    def conversion_level(self, sensors):
+        return max((self.conversion_levels[sensor] for sensor in sensors), default=Config.TEMP_CURRENCY)
+
+    def tick_period(self, reading_period):
+        intervals = [self.sensor_interval(sensor) for sensor in Config.SENSOR_LIST]
+        if self.adaptive:
+            intervals.append(Config.ADAPTIVE_SAMPLING['min_interval'])
+        return min([reading_period] + intervals)
+
+    def sensor_interval(self, sensor):
+        if sensor in self.adaptive:
+            return self.adaptive[sensor].interval
+        return Config.get_sensor_interval(sensor)
+
+    def due_buses(self, tick_time, period):
+        buses = []
+        for session, sensors in self.buses:
+            due = [sensor for sensor in sensors if self.next_due.get(sensor, 0) <= tick_time + period / 2]
+            for sensor in due:
+                self.last_due[sensor] = tick_time
+                self.next_due[sensor] = tick_time + self.sensor_interval(sensor)
+            buses.append((session, due))
+        return buses
+
+    def adapt_interval(self, session, sensor):
+        adaptive = self.adaptive[sensor]
+        if not adaptive.update(session.TEMPERATURE_LOG[sensor], monotonic()):
+            return
+        self.logger.debug(f'Датчик {sensor}: период считывания {adaptive.interval} сек.')
+        if sensor in self.last_due:
+            self.next_due[sensor] = self.last_due[sensor] + adaptive.interval
+        if Config.ADAPTIVE_SAMPLING['adapt_currency'] and (sensor & 0xFF) != 0x10:
+            level = min(Config.ADAPTIVE_SAMPLING['idle_currency'], 3) if adaptive.idle() else self.sensor_currency(sensor)
+            if level != self.conversion_levels[sensor]:
+                if session.check_registers(sensor, level, copy=False):
+                    self.conversion_levels[sensor] = level
+                else:
+                    self.conversion_levels[sensor] = 3
+
+    def run_on_buses(self, task, buses=None):
+        buses = self.buses if buses is None else buses
+        if self.executor is None:
+            return [task(session, sensors) for session, sensors in buses]
+        futures = [self.executor.submit(task, session, sensors) for session, sensors in buses]
+        return [future.result() for future in futures]
+
+    def merge_temperature_log(self):
+        self.TEMPERATURE_LOG = {}
+        for session, sensors in self.buses:
+            for sensor in sensors:
+                self.TEMPERATURE_LOG[sensor] = self.health[sensor].reading()
+
+    def get_temperature(self, buses=None):
+        self.run_on_buses(self.scan_bus, buses)
+        self.merge_temperature_log()
+        self.publish()
+
+    def scan_bus(self, session, sensors):
+        if not sensors:
+            return
+        session.retry.start_cycle()
+        if session.skip_rom_convert():
+            session.wait_conversion(self.conversion_level(sensors))
+            self.read_sensors(session, self.alarm_filter(session, sensors))
+        else:
+            self.fail_sensors(session, sensors)
+        session.retry.stop_cycle()
+
+    def scan_bus_pipelined(self, session, sensors):
+        session.retry.start_cycle()
+        pending_sensors = self.pending_sensors.get(session, [])
+        if session.conversion_pending:
+            session.wait_conversion(self.conversion_level(pending_sensors))
+            self.read_sensors(session, self.alarm_filter(session, pending_sensors))
+        else:
+            self.fail_sensors(session, pending_sensors)
+        session.retry.stop_cycle()
+        self.pending_sensors[session] = sensors
+        if sensors:
+            session.skip_rom_convert()
+
+    def fail_sensors(self, session, sensors):
+        if not sensors:
+            return
+        self.logger.warning(f'Шина {session.path}: преобразование температуры не запущено, не считано датчиков: {len(sensors)}')
+        for sensor in sensors:
+            health = self.health[sensor]
+            if not health.due(monotonic()):
+                continue
+            self.fresh[sensor] = False
+            if health.update(False, None, monotonic()):
+                self.log_health(health)
+
+    def read_sensors(self, session, sensors):
+        if Config.SHED_POLICY != 'none':
+            sensors = sorted(sensors, key=lambda sensor: (-Config.get_sensor_priority(sensor), sensor not in self.deferred))
+        shed = []
+        for index, sensor in enumerate(sensors):
+            if session.retry.cycle_expired():
+                self.logger.warning(f'Шина {session.path}: время цикла исчерпано, не считано датчиков: {len(sensors) - index}')
+                break
+            health = self.health[sensor]
+            if not health.due(monotonic()):
+                continue
+            if self.should_shed(session, sensor):
+                shed.append(sensor)
+                continue
+            start_time = monotonic()
+            RESULT = session.get_temperature(sensor)
+            self.read_times[session] = 0.8 * self.read_times.get(session, monotonic() - start_time) + 0.2 * (monotonic() - start_time)
+            self.deferred.discard(sensor)
+            self.fresh[sensor] = RESULT
+            if health.update(RESULT, session.TEMPERATURE_LOG.get(sensor), monotonic()):
+                self.log_health(health)
+            if RESULT and sensor in self.adaptive:
+                self.adapt_interval(session, sensor)
+        if shed:
+            self.logger.warning(f'Шина {session.path}: для соблюдения периода считывания пропущено датчиков с низким приоритетом: {len(shed)}')
+            if Config.SHED_POLICY == 'defer':
+                self.deferred.update(shed)
+                for sensor in shed:
+                    self.next_due[sensor] = 0
+
+    def should_shed(self, session, sensor):
+        if Config.SHED_POLICY == 'none' or self.cycle_deadline is None or Config.get_sensor_priority(sensor) > 0:
+            return False
+        return monotonic() + self.read_times.get(session, 0) + self.SHED_MARGIN > self.cycle_deadline
+
+    def log_health(self, health):
+        if health.state == SensorHealth.HEALTHY:
+            self.logger.info(f'Датчик {health.rom} снова отвечает')
+        elif health.state == SensorHealth.DEGRADED:
+            self.logger.warning(f'Датчик {health.rom} не ответил {health.failures} раз подряд')
+        elif health.state == SensorHealth.QUARANTINED and health.failures > health.quarantine_after:
+            self.logger.warning(f'Датчик {health.rom} по-прежнему не отвечает. Следующая проверка через {health.probe_period} сек.')
+        elif health.state == SensorHealth.QUARANTINED:
+            self.logger.critical(f'Датчик {health.rom} не работает: не ответил {health.failures} раз подряд. Следующая проверка через {health.probe_period} сек.')
+
+    def format_temperature(self, sensor):
+        state = self.health[sensor].state
+        if state == SensorHealth.HEALTHY:
+            return f'{sensor}={self.TEMPERATURE_LOG[sensor]}'
+        return f'{sensor}={self.TEMPERATURE_LOG[sensor]}({state})'
+
+    def publish(self):
+        self.logger.info(' '.join(self.format_temperature(key) for key in self.TEMPERATURE_LOG.keys()))
         self.write_temperature_to_file(Config.TEMP_FILE_PATH)
+        fresh, self.fresh = self.fresh, {}
+        self.write_history(fresh)
+        self.write_latest(fresh)
+        self.write_columns(fresh)
+
+    def open_history(self):
+        if not Config.HISTORY['path']:
+            return None
+        try:
+            history = HistoryFile(Config.HISTORY['path'], Config.HISTORY['file_size'], int(Config.HISTORY['keep']))
+        except (OSError, ValueError) as error:
+            self.logger.error(f'Ошибка открытия файла истории "{Config.HISTORY["path"]}": {error}')
+            return None
+        self.logger.info(f'Файл истории "{history.path}": записей {history.count} из {history.capacity}')
+        return history
+
+    def write_history(self, fresh):
+        if self.history is None:
+            return
+        try:
+            self.history.append((sensor, self.TEMPERATURE_LOG[sensor], self.health[sensor].state, RESULT) for sensor, RESULT in fresh.items() if sensor in self.TEMPERATURE_LOG)
+        except (OSError, ValueError) as error:
+            self.logger.error(f'Ошибка записи файла истории "{self.history.path}": {error}. Запись истории остановлена.')
+            self.history.close()
+            self.history = None
+
+    def open_latest(self):
+        if not Config.LATEST_TABLE['path']:
+            return None
+        try:
+            return LatestTable(Config.LATEST_TABLE['path'], max(int(Config.LATEST_TABLE['slots']), len(Config.SENSOR_LIST)))
+        except OSError as error:
+            self.logger.error(f'Ошибка создания таблицы последних показаний "{Config.LATEST_TABLE["path"]}": {error}')
+            return None
+
+    def open_columns(self):
+        if not Config.COLUMN_STORE['path']:
+            return None
+        try:
+            return ColumnStore(Config.COLUMN_STORE['path'], int(Config.COLUMN_STORE['chunk_size']), Config.COLUMN_STORE['flush_period'])
+        except OSError as error:
+            self.logger.error(f'Ошибка открытия хранилища истории "{Config.COLUMN_STORE["path"]}": {error}')
+            return None
+
+    def write_columns(self, fresh):
+        if self.columns is None:
+            return
+        try:
+            self.columns.append((sensor, self.TEMPERATURE_LOG[sensor]) for sensor, RESULT in fresh.items() if RESULT and sensor in self.TEMPERATURE_LOG)
+        except OSError as error:
+            self.logger.error(f'Ошибка записи хранилища истории "{self.columns.directory}": {error}. Запись в хранилище остановлена.')
+            self.columns = None
+
+    def close_storage(self):
+        for storage in (self.history, self.latest, self.columns):
+            if storage is not None:
+                storage.close()
+
+    def write_latest(self, fresh):
+        now = time()
+        for sensor, RESULT in fresh.items():
+            if RESULT:
+                self.read_stamps[sensor] = now
+        if self.latest is None:
+            return
+        try:
+            self.latest.publish((sensor, self.read_stamps.get(sensor, 0), value, self.health[sensor].state, self.health[sensor].failures == 0) for sensor, value in self.TEMPERATURE_LOG.items())
+        except (OSError, ValueError) as error:
+            self.logger.error(f'Ошибка записи таблицы последних показаний "{self.latest.path}": {error}. Запись таблицы остановлена.')
+            self.latest.close()
+            self.latest = None
 
     def write_temperature_to_file(self, dest_path):
         with open(dest_path, 'w', encoding='utf-8') as f:
             f.write(f'''[{get_current_date()}]> ''')
-            f.write(' '.join((f'{key}={RODOS_HID.TEMPERATURE_LOG[key]}'for key in RODOS_HID.TEMPERATURE_LOG.keys())))
+            f.write(' '.join(self.format_temperature(key) for key in self.TEMPERATURE_LOG.keys()))
+
+    def complete_tick(self, scheduler, start_time):
+        missed = scheduler.complete(start_time)
+        delta_time = scheduler.latencies[-1]
+        self.logger.debug(f'Считывание температуры выполнено за {delta_time:.3f} сек.')
+
+        current, peak = tracemalloc.get_traced_memory()
+        self.logger.debug(f"Current memory usage is {current / 1024:.2f} KB; Peak was {peak / 1024:.2f} KB")
+
+        if missed:
+            self.logger.warning(f'Считывание температуры заняло {delta_time:.3f} сек. при периоде {scheduler.period} сек., пропущено циклов: {missed}')
+        if scheduler.ticks % scheduler.STATS_PERIOD == 0:
+            stats = scheduler.stats()
+            exhausted = sum(session.retry.exhausted for session in self.sessions)
+            self.logger.info(f'Циклов: {stats["ticks"]}, с превышением периода: {stats["overruns"]}, пропущено: {stats["missed"]}, повторов прервано по времени: {exhausted}. Время цикла, сек.: p50={stats["p50"]:.3f} p90={stats["p90"]:.3f} p99={stats["p99"]:.3f} max={stats["max"]:.3f}')
 
     def run_idle(self, reading_period):
+        scheduler = Scheduler(self.tick_period(reading_period))
         while True:
-            start_time = monotonic()
+            start_time = scheduler.wait()
+            self.cycle_deadline = scheduler.deadline()
 
-            self.get_temperature()
+            self.get_temperature(self.due_buses(start_time, scheduler.period))
+            self.check_discovery()
 
-            end_time = monotonic()
-            delta_time = end_time - start_time
-            self.logger.debug(f'Считывание температуры выполнено за {delta_time:.3f} сек.')
-            
-            current, peak = tracemalloc.get_traced_memory()
-            self.logger.debug(f"Current memory usage is {current / 1024:.2f} KB; Peak was {peak / 1024:.2f} KB")
-            
-            if delta_time < reading_period:
-                sleep(reading_period - delta_time)
+            self.complete_tick(scheduler, start_time)
+
+    def run_pipelined(self, reading_period):
+        scheduler = Scheduler(self.tick_period(reading_period))
+        self.run_on_buses(self.scan_bus_pipelined, self.due_buses(scheduler.next_tick, scheduler.period))
+        while True:
+            start_time = scheduler.wait()
+            self.cycle_deadline = scheduler.deadline()
+
+            self.run_on_buses(self.scan_bus_pipelined, self.due_buses(start_time + scheduler.period, scheduler.period))
+            self.merge_temperature_log()
+            self.publish()
+            self.check_discovery()
+
+            self.complete_tick(scheduler, start_time)
     
     def run(self):
-        if Config.ARGUMENTS.idle:
-            self.run_idle(Config.READING_PERIOD)
-        else:
-            self.get_temperature()
+        try:
+            if Config.ARGUMENTS.idle and Config.ARGUMENTS.pipeline:
+                self.run_pipelined(Config.READING_PERIOD)
+            elif Config.ARGUMENTS.idle:
+                self.run_idle(Config.READING_PERIOD)
+            else:
+                self.get_temperature()
+        finally:
+            self.close_storage()
 
 class Logger:
     DEFAULT_LOG_LEVEL = 'WARNING'
@@ -440,6 +1266,8 @@ class Logger:
         self.DELAYED_MESSAGES.append((level.upper(), message))
     
     def send_delayed_messages(self):
+        if not self.logger.handlers:
+            return
         for message in self.DELAYED_MESSAGES:
             self.__message(*message)
 
@@ -496,23 +1324,55 @@ class Config:
     )
     DEFAULT_READING_PERIOD = 2
     DEFAULT_TEMP_CURRENCY = 3
+    DEFAULT_COMPLETION_POLLING = False
+    COMPLETION_POLLING = DEFAULT_COMPLETION_POLLING
+    DEFAULT_RETRY_POLICY = dict(attempts=3, backoff=0, sensor_budget=0.5, cycle_budget=0)
+    RETRY_POLICY = DEFAULT_RETRY_POLICY
+    DEFAULT_SENSOR_HEALTH = dict(degraded_after=1, quarantine_after=3, probe_period=60, recover_after=1)
+    SENSOR_HEALTH = DEFAULT_SENSOR_HEALTH
+    DEFAULT_ADAPTIVE_SAMPLING = dict(enabled=False, deadband=0.25, rate_threshold=0.05, min_interval=1, max_interval=60, growth=2, adapt_currency=False, idle_currency=0)
+    ADAPTIVE_SAMPLING = DEFAULT_ADAPTIVE_SAMPLING
+    DEFAULT_SHED_POLICY = 'none'
+    SHED_POLICIES = ('none', 'skip', 'defer')
+    SHED_POLICY = DEFAULT_SHED_POLICY
+    DEFAULT_ALARM_MONITORING = dict(enabled=False, sweep_period=60)
+    ALARM_MONITORING = DEFAULT_ALARM_MONITORING
+    DEFAULT_SENSOR_DISCOVERY = dict(period=0, remove_missing=False)
+    SENSOR_DISCOVERY = DEFAULT_SENSOR_DISCOVERY
+    DEFAULT_HISTORY = dict(path='', file_size=16, keep=10)
+    HISTORY = DEFAULT_HISTORY
+    DEFAULT_LATEST_TABLE = dict(path='', slots=256)
+    LATEST_TABLE = DEFAULT_LATEST_TABLE
+    DEFAULT_COLUMN_STORE = dict(path='', chunk_size=65536, flush_period=60)
+    COLUMN_STORE = DEFAULT_COLUMN_STORE
+    SENSOR_OPTIONS = {}
+    VERIFIED_CURRENCY = {}
+    VERIFIED_ALARMS = {}
+    CONFIG_FILE_PATH = ''
     CONFIG_FILE = {}
     logger = Logger('Config')
 
     @classmethod
-    def create_new_config_file(cls):
-        if not RODOS_HID.initialized:
-            RODOS_HID.initialize()
-        RODOS_HID.find_sensors()
+    def create_new_config_file(cls, sessions):
         creation_date = get_current_date()
         CONFIG_FILE = {
             'creation_date': creation_date,
             'last_edit_date': creation_date,
-            'sensor_list': RODOS_HID.sensors,
+            'sensor_list': cls.find_sensors(sessions),
             'temp_file_path': os.path.join(os.path.dirname(cls.DEFAULT_CONFIG_FILES[0]), 'SSI.temp'),
             "loggers": (),
             'reading_period': cls.DEFAULT_READING_PERIOD,
             'temp_currency': cls.DEFAULT_TEMP_CURRENCY,
+            'completion_polling': cls.DEFAULT_COMPLETION_POLLING,
+            'retry_policy': cls.DEFAULT_RETRY_POLICY,
+            'sensor_health': cls.DEFAULT_SENSOR_HEALTH,
+            'shed_policy': cls.DEFAULT_SHED_POLICY,
+            'adaptive_sampling': cls.DEFAULT_ADAPTIVE_SAMPLING,
+            'alarm_monitoring': cls.DEFAULT_ALARM_MONITORING,
+            'sensor_discovery': cls.DEFAULT_SENSOR_DISCOVERY,
+            'history': cls.DEFAULT_HISTORY,
+            'latest_table': cls.DEFAULT_LATEST_TABLE,
+            'column_store': cls.DEFAULT_COLUMN_STORE,
         }
 
         cls.CONFIG_FILE_PATH = cls.DEFAULT_CONFIG_FILES[0]
@@ -526,17 +1386,78 @@ class Config:
         CONFIG_FILE = dict(
             creation_date=cls.CREATION_DATE,
             last_edit_date=cls.LAST_EDIT_DATE,
-            sensor_list=cls.SENSOR_LIST,
+            sensor_list=cls.get_sensor_list(),
             temp_file_path=cls.TEMP_FILE_PATH,
             loggers=cls.LOGGERS,
             reading_period =cls.READING_PERIOD,
-            temp_currency = cls.TEMP_CURRENCY
+            temp_currency = cls.TEMP_CURRENCY,
+            completion_polling = cls.COMPLETION_POLLING,
+            retry_policy = cls.RETRY_POLICY,
+            sensor_health = cls.SENSOR_HEALTH,
+            shed_policy = cls.SHED_POLICY,
+            adaptive_sampling = cls.ADAPTIVE_SAMPLING,
+            alarm_monitoring = cls.ALARM_MONITORING,
+            sensor_discovery = cls.SENSOR_DISCOVERY,
+            history = cls.HISTORY,
+            latest_table = cls.LATEST_TABLE,
+            column_store = cls.COLUMN_STORE,
+            verified_currency = [[sensor, level] for sensor, level in cls.VERIFIED_CURRENCY.items()],
+            verified_alarms = [[sensor, th, tl] for sensor, (th, tl) in cls.VERIFIED_ALARMS.items()]
         )
         try:
             json.dump(CONFIG_FILE, open(cls.CONFIG_FILE_PATH, 'w', encoding='utf-8'), indent=4)
         except IOError:
             cls.logger.error(f'Ошибка записи конфигурационного файла "{cls.CONFIG_FILE_PATH}"')
 
+    @classmethod
+    def get_sensor_list(cls):
+        return [dict(rom=sensor, **cls.SENSOR_OPTIONS[sensor]) if cls.SENSOR_OPTIONS.get(sensor) else sensor for sensor in cls.SENSOR_LIST]
+
+    @classmethod
+    def get_sensor_currency(cls, sensor):
+        return cls.SENSOR_OPTIONS.get(sensor, {}).get('temp_currency', cls.TEMP_CURRENCY)
+
+    @classmethod
+    def get_sensor_interval(cls, sensor):
+        return cls.SENSOR_OPTIONS.get(sensor, {}).get('interval', cls.READING_PERIOD)
+
+    @classmethod
+    def get_sensor_priority(cls, sensor):
+        return cls.SENSOR_OPTIONS.get(sensor, {}).get('priority', 0)
+
+    @classmethod
+    def get_sensor_alarm(cls, sensor):
+        options = cls.SENSOR_OPTIONS.get(sensor, {})
+        if 'th' not in options and 'tl' not in options:
+            return None
+        return [options.get('th', 125), options.get('tl', -55)]
+
+    @classmethod
+    def update_verified_alarms(cls, thresholds):
+        if all(cls.VERIFIED_ALARMS.get(sensor) == value for sensor, value in thresholds.items()):
+            return
+        cls.VERIFIED_ALARMS = {sensor: value for sensor, value in cls.VERIFIED_ALARMS.items() if sensor in cls.SENSOR_LIST}
+        cls.VERIFIED_ALARMS.update(thresholds)
+        if cls.CONFIG_FILE_PATH:
+            cls.save_config_file()
+
+    @classmethod
+    def update_verified_currency(cls, levels):
+        if all(cls.VERIFIED_CURRENCY.get(sensor) == level for sensor, level in levels.items()):
+            return
+        cls.VERIFIED_CURRENCY = {sensor: level for sensor, level in cls.VERIFIED_CURRENCY.items() if sensor in cls.SENSOR_LIST}
+        cls.VERIFIED_CURRENCY.update(levels)
+        if cls.CONFIG_FILE_PATH:
+            cls.save_config_file()
+
+    @classmethod
+    def discard_verified_currency(cls, sensors):
+        if not any(sensor in cls.VERIFIED_CURRENCY for sensor in sensors):
+            return
+        cls.VERIFIED_CURRENCY = {sensor: level for sensor, level in cls.VERIFIED_CURRENCY.items() if sensor not in sensors}
+        if cls.CONFIG_FILE_PATH:
+            cls.save_config_file()
+
     @classmethod
     def load_config_file(cls, filepath):
         cls.CONFIG_FILE_PATH = filepath
@@ -586,7 +1507,7 @@ class Config:
         if not 'sensor_list' in config_file.keys():
             cls.logger.error(f'В конфигурационном файле "{filepath}" отсутствует список датчиков (sensor_list).')
             return False
-        if not isinstance(config_file['sensor_list'], list):
+        if not isinstance(config_file['sensor_list'], list) or not all(isinstance(sensor, int) or (isinstance(sensor, dict) and isinstance(sensor.get('rom'), int)) for sensor in config_file['sensor_list']):
             cls.logger.error(f'В конфигурационном файле "{filepath}" неверно задан список датчиков температуры (sensor_list): {config_file["sensor_list"]}')
             return False
         if len(config_file['sensor_list']) == 0:
@@ -649,17 +1570,52 @@ class Config:
         return False
 
     @classmethod
-    def check_rescan(cls):
+    def check_rescan(cls, sessions):
         if cls.ARGUMENTS.rescan:
             cls.logger.info('Обновление списка датчиков температуры.')
-            cls.rescan_sensors()
+            cls.rescan_sensors(sessions)
     
     @classmethod
-    def rescan_sensors(cls):
-        RODOS_HID.find_sensors()
-        cls.SENSOR_LIST = RODOS_HID.sensors
+    def find_sensors(cls, sessions):
+        sensors = []
+        for session in sessions:
+            session.search_sensors()
+            sensors.extend(session.sensors)
+        if not sensors:
+            cls.logger.critical('Датчики DALLAS не найдены. Завершение программы')
+            sys.exit()
+        return sensors
+
+    @classmethod
+    def rescan_sensors(cls, sessions):
+        if cls.SENSOR_LIST and all([session.discover_sensors(cls.SENSOR_LIST) for session in sessions]):
+            found = [sensor for session in sessions for sensor in session.sensors]
+            if found:
+                cls.apply_discovery([sensor for sensor in found if sensor not in cls.SENSOR_LIST], [sensor for sensor in cls.SENSOR_LIST if sensor not in found], True)
+                return
+        cls.SENSOR_LIST = cls.find_sensors(sessions)
         cls.LAST_EDIT_DATE = get_current_date()
         cls.save_config_file()
+
+    @classmethod
+    def apply_discovery(cls, added, removed, remove_missing=None):
+        if remove_missing is None:
+            remove_missing = cls.SENSOR_DISCOVERY['remove_missing']
+        for sensor in added:
+            cls.logger.warning(f'Обнаружен новый датчик: {sensor}')
+        for sensor in removed:
+            cls.logger.warning(f'Датчик {sensor} не найден на шине' + (' и удалён из списка датчиков' if remove_missing else ''))
+        if not added and not (removed and remove_missing):
+            cls.logger.info('Список датчиков не изменился')
+            return
+        cls.SENSOR_LIST = cls.SENSOR_LIST + [sensor for sensor in added if sensor not in cls.SENSOR_LIST]
+        if remove_missing:
+            cls.SENSOR_LIST = [sensor for sensor in cls.SENSOR_LIST if sensor not in removed]
+            for sensor in removed:
+                cls.SENSOR_OPTIONS.pop(sensor, None)
+        cls.LAST_EDIT_DATE = get_current_date()
+        if cls.CONFIG_FILE_PATH:
+            cls.save_config_file()
     
     @classmethod
     def _load_from_dict(cls, config_dict):
@@ -674,35 +1630,116 @@ class Config:
             cls.CREATION_DATE = cls.LAST_EDIT_DATE
 
         if 'reading_period' in config_dict.keys():
-            if config_dict['reading_period'] < 1:
-                cls.logger.warning('Указан слишком маленький период считывания. Установлен минимальный: 1 сек.')
-                cls.READING_PERIOD = 1
-            elif config_dict['reading_period'] > 600:
-                cls.logger.warning('Указан слишком большой период считывания. Установлен максимальный: 600 сек.')
-                cls.READING_PERIOD = 600
-            else:
-                cls.READING_PERIOD = config_dict['reading_period']
+            cls.READING_PERIOD = cls._check_reading_period(config_dict['reading_period'])
         else:
             cls.logger.warning(f'В конфигурационном файле отсутствует поле периода считывания температуры (reding_period). Установлено значение по умолчанию: {cls.DEFAULT_READING_PERIOD} сек.')
             cls.READING_PERIOD = cls.DEFAULT_READING_PERIOD
 
         if 'temp_currency' in config_dict.keys():
-            if config_dict["temp_currency"] < 0:
-                cls.logger.warning(f'Слишком низкий уровень точности температуры: {config_dict["temp_currency"]}. Установлен минимальный: 0')
-                cls.TEMP_CURRENCY = 0
-            elif config_dict['temp_currency'] > 3:
-                cls.logger.warning(f'Слишком высокий уровень точности температуры: {config_dict["temp_currency"]}. Установлен максимальный: 3')
-                cls.TEMP_CURRENCY = 3
-            else:
-                cls.TEMP_CURRENCY = config_dict['temp_currency']
+            cls.TEMP_CURRENCY = cls._check_temp_currency(config_dict['temp_currency'])
         else:
             cls.logger.warning(f'В конфигурационном файле отсутствует поле точности измерения температуры (temp_currency). Установлено значение по умолчанию: {cls.DEFAULT_TEMP_CURRENCY}')
             cls.TEMP_CURRENCY = cls.DEFAULT_TEMP_CURRENCY
         
-        cls.SENSOR_LIST = config_dict['sensor_list']
+        if 'completion_polling' in config_dict.keys():
+            cls.COMPLETION_POLLING = bool(config_dict['completion_polling'])
+        else:
+            cls.COMPLETION_POLLING = cls.DEFAULT_COMPLETION_POLLING
+
+        cls.RETRY_POLICY = cls._load_options(config_dict, 'retry_policy', cls.DEFAULT_RETRY_POLICY, ('attempts',))
+        if config_dict.get('shed_policy', cls.DEFAULT_SHED_POLICY) in cls.SHED_POLICIES:
+            cls.SHED_POLICY = config_dict.get('shed_policy', cls.DEFAULT_SHED_POLICY)
+        else:
+            cls.logger.warning(f'Неверно задана политика пропуска датчиков (shed_policy): {config_dict["shed_policy"]}. Установлено значение по умолчанию: {cls.DEFAULT_SHED_POLICY}')
+            cls.SHED_POLICY = cls.DEFAULT_SHED_POLICY
+
+        cls.SENSOR_HEALTH = cls._load_options(config_dict, 'sensor_health', cls.DEFAULT_SENSOR_HEALTH, ('degraded_after', 'quarantine_after', 'recover_after'))
+        cls.ADAPTIVE_SAMPLING = cls._load_options(config_dict, 'adaptive_sampling', cls.DEFAULT_ADAPTIVE_SAMPLING)
+        cls.ADAPTIVE_SAMPLING['min_interval'] = cls._check_reading_period(cls.ADAPTIVE_SAMPLING['min_interval'])
+        cls.ADAPTIVE_SAMPLING['max_interval'] = cls._check_reading_period(cls.ADAPTIVE_SAMPLING['max_interval'])
+        cls.ALARM_MONITORING = cls._load_options(config_dict, 'alarm_monitoring', cls.DEFAULT_ALARM_MONITORING)
+        cls.SENSOR_DISCOVERY = cls._load_options(config_dict, 'sensor_discovery', cls.DEFAULT_SENSOR_DISCOVERY)
+        cls.HISTORY = cls._load_options(config_dict, 'history', cls.DEFAULT_HISTORY, ('keep',))
+        cls.LATEST_TABLE = cls._load_options(config_dict, 'latest_table', cls.DEFAULT_LATEST_TABLE, ('slots',))
+        cls.COLUMN_STORE = cls._load_options(config_dict, 'column_store', cls.DEFAULT_COLUMN_STORE, ('chunk_size',))
+
+        if isinstance(config_dict.get('verified_currency'), list):
+            cls.VERIFIED_CURRENCY = {sensor: level for sensor, level in config_dict['verified_currency']}
+        else:
+            cls.VERIFIED_CURRENCY = {}
+
+        if isinstance(config_dict.get('verified_alarms'), list):
+            cls.VERIFIED_ALARMS = {sensor: [th, tl] for sensor, th, tl in config_dict['verified_alarms']}
+        else:
+            cls.VERIFIED_ALARMS = {}
+
+        cls.SENSOR_LIST = []
+        cls.SENSOR_OPTIONS = {}
+        for sensor in config_dict['sensor_list']:
+            if isinstance(sensor, dict):
+                options = {key: value for key, value in sensor.items() if key != 'rom'}
+                if 'temp_currency' in options:
+                    options['temp_currency'] = cls._check_temp_currency(options['temp_currency'])
+                if 'interval' in options:
+                    options['interval'] = cls._check_reading_period(options['interval'])
+                for key in ('th', 'tl'):
+                    if key in options:
+                        options[key] = cls._check_alarm_threshold(options[key])
+                sensor = sensor['rom']
+                cls.SENSOR_OPTIONS[sensor] = options
+            cls.SENSOR_LIST.append(sensor)
         cls.TEMP_FILE_PATH = config_dict['temp_file_path']
         cls.LOGGERS = config_dict['loggers']
 
+    @classmethod
+    def _load_options(cls, config_dict, name, defaults, counters=()):
+        options = dict(defaults)
+        if not isinstance(config_dict.get(name), dict):
+            return options
+        for key, value in config_dict[name].items():
+            if key not in options:
+                cls.logger.warning(f'Неизвестный параметр поля {name}: {key}')
+            elif isinstance(options[key], str):
+                if isinstance(value, str):
+                    options[key] = value
+                else:
+                    cls.logger.warning(f'Неверное значение параметра {key} поля {name}: {value}. Установлено значение по умолчанию: "{options[key]}"')
+            elif not isinstance(value, (int, float)) or value < 0 or (key in counters and value < 1):
+                cls.logger.warning(f'Неверное значение параметра {key} поля {name}: {value}. Установлено значение по умолчанию: {options[key]}')
+            else:
+                options[key] = int(value) if key in counters else value
+        return options
+
+    @classmethod
+    def _check_reading_period(cls, reading_period):
+        if reading_period < 1:
+            cls.logger.warning('Указан слишком маленький период считывания. Установлен минимальный: 1 сек.')
+            return 1
+        elif reading_period > 600:
+            cls.logger.warning('Указан слишком большой период считывания. Установлен максимальный: 600 сек.')
+            return 600
+        return reading_period
+
+    @classmethod
+    def _check_temp_currency(cls, temp_currency):
+        if temp_currency < 0:
+            cls.logger.warning(f'Слишком низкий уровень точности температуры: {temp_currency}. Установлен минимальный: 0')
+            return 0
+        elif temp_currency > 3:
+            cls.logger.warning(f'Слишком высокий уровень точности температуры: {temp_currency}. Установлен максимальный: 3')
+            return 3
+        return temp_currency
+
+    @classmethod
+    def _check_alarm_threshold(cls, threshold):
+        if threshold < -55:
+            cls.logger.warning(f'Слишком низкий порог сигнализации: {threshold}. Установлен минимальный: -55')
+            return -55
+        elif threshold > 125:
+            cls.logger.warning(f'Слишком высокий порог сигнализации: {threshold}. Установлен максимальный: 125')
+            return 125
+        return int(threshold)
+
     @classmethod
     def get_args(cls):
         parser = argparse.ArgumentParser(add_help=False, description="Скрипт, который выполняет считывание температуры с модуля SiLines RODOS-5 в ОС Linux.")
@@ -712,7 +1749,11 @@ class Config:
         parser.add_argument('-r', '--rescan', action='store_true', help='Найти подключенные датчики и сохранить информацию в конфигурационный файл')
         parser.add_argument('-c', '--config', type=str, default='', help='Загрузить выбранный конфигурационный файл')
         parser.add_argument('-i', '--idle', action='store_true', help='Запуск программы считывания в бесконечном цикле')
+        parser.add_argument('-p', '--pipeline', action='store_true', help='Вместе с ключом -i: запуск следующего преобразования температуры сразу после считывания датчиков, запись результатов выполняется во время преобразования')
         parser.add_argument('-s', '--show', action='store_true', help='Данный ключ позволяет найти все доступные датчики температуры, вывести их в консоль и завершить работу скрипта.')
+        parser.add_argument('--report', action='store_true', help='Вывести статистику по датчикам из файла истории (поле "history") и завершить работу скрипта. Необходим пакет numpy')
+        parser.add_argument('--from', dest='report_from', type=parse_date, default=None, help='Вместе с ключом --report: начало интервала, "ДД.ММ.ГГГГ ЧЧ:ММ:СС"')
+        parser.add_argument('--to', dest='report_to', type=parse_date, default=None, help='Вместе с ключом --report: конец интервала (не включая), "ДД.ММ.ГГГГ ЧЧ:ММ:СС"')
         cls.ARGUMENTS = parser.parse_args()
 
 def get_current_date():
@@ -721,26 +1762,38 @@ def get_current_date():
 
 if __name__ == '__main__':
     tracemalloc.start()
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     Config.get_args()
 
     if Config.ARGUMENTS.show:
-        RODOS_HID.initialize()
-        RODOS_HID.find_sensors()
+        sessions = RODOS_HID.open_all()
+        sensors = Config.find_sensors(sessions)
         print('='*40)
-        print(f'Найдено температурных датчиков: {len(RODOS_HID.sensors)}. Список:')
-        for sensor in RODOS_HID.sensors:
-            print(sensor)
+        print(f'Найдено температурных датчиков: {len(sensors)}. Список:')
+        for session in sessions:
+            if len(sessions) > 1:
+                print(f'Адаптер {session.path}:')
+            for sensor in session.sensors:
+                print(sensor)
         print('='*40)
         sys.exit()
 
-    if not Config.search_config_file():
-        Config.create_new_config_file()
+    config_found = Config.search_config_file()
+
+    if Config.ARGUMENTS.report:
+        if not Config.HISTORY['path']:
+            print('Файл истории не задан (поле "history" конфигурационного файла). Отчёт не может быть построен.', file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0 if print_report(Config.HISTORY['path'], Config.ARGUMENTS.report_from, Config.ARGUMENTS.report_to) else 1)
+
+    sessions = RODOS_HID.open_all()
 
-    RODOS_HID.initialize()
+    if not config_found:
+        Config.create_new_config_file(sessions)
 
-    Config.check_rescan()
+    Config.check_rescan(sessions)
 
-    temperature_scanner = TemperatureScanner()
+    temperature_scanner = TemperatureScanner(sessions)
     temperature_scanner.run()
 
     tracemalloc.stop()
@@ -0,0 +1,665 @@
+import argparse
+import bisect
+from array import array
+import math
+import mmap
+import os
+import struct
+import sys
+from datetime import datetime
+from time import monotonic, sleep, time
+
+
+def search_sorted(count, value, key):
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if key(middle) < value:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class HistoryFile:
+    MAGIC = b'SSTH'
+    VERSION = 1
+    HEADER = struct.Struct('<4sHHQ')
+    HEADER_SIZE = 64
+    RECORD = struct.Struct('<dQhBB')
+    NO_VALUE = -0x8000
+    SCALE = 16
+    STATUSES = ('healthy', 'degraded', 'quarantined', 'probing')
+
+    def __init__(self, path, file_size=16, keep=10):
+        self.path = path
+        self.capacity = max((int(file_size * 1024 * 1024) - self.HEADER_SIZE) // self.RECORD.size, 1)
+        self.keep = keep
+        self.file = None
+        self.map = None
+        self.count = 0
+        self.open()
+
+    @classmethod
+    def encode(cls, value):
+        if value is None or math.isnan(value):
+            return cls.NO_VALUE
+        return max(min(round(value * cls.SCALE), 0x7FFF), -0x7FFF)
+
+    @classmethod
+    def decode(cls, raw):
+        if raw == cls.NO_VALUE:
+            return float('nan')
+        return raw / cls.SCALE
+
+    def open(self):
+        size = self.HEADER_SIZE + self.capacity * self.RECORD.size
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) >= self.HEADER_SIZE
+        self.file = open(self.path, 'r+b' if exists else 'w+b')
+        if exists:
+            magic, version, record_size, count = self.HEADER.unpack(self.file.read(self.HEADER.size))
+            if magic != self.MAGIC or version != self.VERSION or record_size != self.RECORD.size:
+                self.file.close()
+                raise ValueError(f'Файл "{self.path}" не является файлом истории температуры')
+            self.count = count
+            size = max(size, os.path.getsize(self.path))
+        else:
+            self.count = 0
+        self.file.truncate(size)
+        self.capacity = (size - self.HEADER_SIZE) // self.RECORD.size
+        self.map = mmap.mmap(self.file.fileno(), size)
+        if not exists:
+            self.HEADER.pack_into(self.map, 0, self.MAGIC, self.VERSION, self.RECORD.size, 0)
+
+    def close(self):
+        if self.map is not None:
+            self.map.flush()
+            self.map.close()
+            self.file.close()
+            self.map = None
+
+    def rotate(self):
+        self.close()
+        for index in range(self.keep - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{index}'):
+                os.replace(f'{self.path}.{index}', f'{self.path}.{index + 1}')
+        if self.keep > 0:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+        self.open()
+
+    def append(self, records):
+        timestamp = time()
+        for rom, value, status, ok in records:
+            if self.count >= self.capacity:
+                self.HEADER.pack_into(self.map, 0, self.MAGIC, self.VERSION, self.RECORD.size, self.count)
+                self.rotate()
+            self.RECORD.pack_into(self.map, self.HEADER_SIZE + self.count * self.RECORD.size, timestamp, rom, self.encode(value), self.STATUSES.index(status), ok)
+            self.count += 1
+        self.HEADER.pack_into(self.map, 0, self.MAGIC, self.VERSION, self.RECORD.size, self.count)
+
+
+class HistoryReader:
+    def __init__(self, path):
+        self.path = path
+        self.files = []
+        index = 1
+        while os.path.exists(f'{path}.{index}'):
+            self.files.insert(0, f'{path}.{index}')
+            index += 1
+        if os.path.exists(path):
+            self.files.append(path)
+
+    def counts(self):
+        counts = []
+        for path in self.files:
+            if os.path.getsize(path) < HistoryFile.HEADER_SIZE:
+                continue
+            with open(path, 'rb') as f:
+                magic, version, record_size, count = HistoryFile.HEADER.unpack(f.read(HistoryFile.HEADER.size))
+            if magic == HistoryFile.MAGIC and version == HistoryFile.VERSION and record_size == HistoryFile.RECORD.size:
+                counts.append((path, min(count, (os.path.getsize(path) - HistoryFile.HEADER_SIZE) // record_size)))
+        return counts
+
+    def segments(self):
+        for path in self.files:
+            with open(path, 'rb') as f:
+                if os.path.getsize(path) < HistoryFile.HEADER_SIZE:
+                    continue
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, version, record_size, count = HistoryFile.HEADER.unpack_from(data, 0)
+                if magic != HistoryFile.MAGIC or version != HistoryFile.VERSION or record_size != HistoryFile.RECORD.size:
+                    data.close()
+                    continue
+                count = min(count, (len(data) - HistoryFile.HEADER_SIZE) // record_size)
+                try:
+                    yield data, count
+                finally:
+                    data.close()
+
+    @staticmethod
+    def timestamp(data, index):
+        return struct.unpack_from('<d', data, HistoryFile.HEADER_SIZE + index * HistoryFile.RECORD.size)[0]
+
+    @classmethod
+    def seek(cls, data, count, start):
+        return search_sorted(count, start, lambda index: cls.timestamp(data, index))
+
+    def read(self, start=None, end=None, sensors=None):
+        for data, count in self.segments():
+            if not count or (start is not None and self.timestamp(data, count - 1) < start):
+                continue
+            if end is not None and self.timestamp(data, 0) >= end:
+                break
+            index = 0 if start is None else self.seek(data, count, start)
+            while index < count:
+                timestamp, rom, raw, status, ok = HistoryFile.RECORD.unpack_from(data, HistoryFile.HEADER_SIZE + index * HistoryFile.RECORD.size)
+                index += 1
+                if end is not None and timestamp >= end:
+                    return
+                if sensors is None or rom in sensors:
+                    yield timestamp, rom, HistoryFile.decode(raw), HistoryFile.STATUSES[status], bool(ok)
+
+
+class LatestTable:
+    MAGIC = b'SSTL'
+    VERSION = 1
+    HEADER = struct.Struct('<4sHHQdI')
+    SEQUENCE = struct.Struct('<Q')
+    SEQUENCE_OFFSET = 8
+    STATE = struct.Struct('<dI')
+    STATE_OFFSET = 16
+    HEADER_SIZE = 64
+    SLOT = struct.Struct('<QdhBB')
+
+    def __init__(self, path, slots=256):
+        self.path = path
+        self.sequence = 0
+        self.map = None
+        exists = os.path.exists(path) and os.path.getsize(path) >= self.HEADER_SIZE
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        valid = False
+        if exists:
+            magic, version, slot_size, sequence, timestamp, count = self.HEADER.unpack(self.file.read(self.HEADER.size))
+            valid = magic == self.MAGIC and version == self.VERSION and slot_size == self.SLOT.size
+            if valid:
+                self.sequence = sequence + (sequence & 0x01)
+        self.resize(slots)
+        if not valid:
+            self.HEADER.pack_into(self.map, 0, self.MAGIC, self.VERSION, self.SLOT.size, self.sequence, 0, 0)
+
+    def resize(self, slots):
+        size = max(self.HEADER_SIZE + slots * self.SLOT.size, os.fstat(self.file.fileno()).st_size)
+        self.slots = (size - self.HEADER_SIZE) // self.SLOT.size
+        if self.map is not None:
+            self.map.close()
+        self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.file.close()
+            self.map = None
+
+    def publish(self, readings):
+        readings = list(readings)
+        self.sequence += 1
+        self.SEQUENCE.pack_into(self.map, self.SEQUENCE_OFFSET, self.sequence)
+        if len(readings) > self.slots:
+            self.resize(max(len(readings), 2 * self.slots))
+        for index, (rom, timestamp, value, status, ok) in enumerate(readings):
+            self.SLOT.pack_into(self.map, self.HEADER_SIZE + index * self.SLOT.size, rom, timestamp, HistoryFile.encode(value), HistoryFile.STATUSES.index(status), ok)
+        self.STATE.pack_into(self.map, self.STATE_OFFSET, time(), len(readings))
+        self.sequence += 1
+        self.SEQUENCE.pack_into(self.map, self.SEQUENCE_OFFSET, self.sequence)
+
+
+class LatestReader:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, slot_size, sequence, timestamp, count = LatestTable.HEADER.unpack_from(self.map, 0)
+        if magic != LatestTable.MAGIC or version != LatestTable.VERSION or slot_size != LatestTable.SLOT.size:
+            self.close()
+            raise ValueError(f'Файл "{path}" не является таблицей последних показаний')
+        self.sequence = None
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def snapshot(self, timeout=1.0):
+        deadline = monotonic() + timeout
+        while monotonic() < deadline:
+            magic, version, slot_size, sequence, timestamp, count = LatestTable.HEADER.unpack_from(self.map, 0)
+            if sequence & 0x01:
+                sleep(0)
+                continue
+            size = LatestTable.HEADER_SIZE + count * LatestTable.SLOT.size
+            if size > len(self.map):
+                self.map.close()
+                self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                continue
+            data = self.map[LatestTable.HEADER_SIZE:size]
+            if LatestTable.SEQUENCE.unpack_from(self.map, LatestTable.SEQUENCE_OFFSET)[0] != sequence:
+                sleep(0)
+                continue
+            self.sequence = sequence
+            readings = {}
+            for rom, updated, raw, status, ok in LatestTable.SLOT.iter_unpack(data):
+                readings[rom] = (HistoryFile.decode(raw), HistoryFile.STATUSES[status], bool(ok), updated)
+            return timestamp, readings
+        raise TimeoutError(f'Не удалось получить согласованный снимок таблицы "{self.path}"')
+
+    def changed(self):
+        return LatestTable.SEQUENCE.unpack_from(self.map, LatestTable.SEQUENCE_OFFSET)[0] != self.sequence
+
+
+def encode_varint(value, buffer):
+    value = (value << 1) ^ (value >> 63)
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def decode_varints(data):
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            values.append((value >> 1) ^ -(value & 0x01))
+            value = shift = 0
+    return values
+
+
+class Rollup:
+    RECORD = struct.Struct('<qhhiI')
+
+    def __init__(self, path, resolution):
+        self.path = path
+        self.resolution = resolution
+        self.start = None
+        self.offset = None
+        self.closed = []
+
+    def resume(self, start):
+        self.start, self.offset = start, None
+        self.min, self.max, self.sum, self.count = 0x7FFF, -0x7FFF, 0, 0
+        offset = (os.path.getsize(self.path) // self.RECORD.size - 1) * self.RECORD.size if os.path.exists(self.path) else -1
+        if offset < 0:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            last_start, low, high, total, count = self.RECORD.unpack(f.read(self.RECORD.size))
+        if last_start == start:
+            self.offset, self.min, self.max, self.sum, self.count = offset, low, high, total, count
+
+    def add(self, timestamp, raw):
+        start = int(timestamp // self.resolution * self.resolution)
+        if self.start is None:
+            self.resume(start)
+        elif start != self.start:
+            self.closed.append((self.offset, self.record()))
+            self.start, self.offset, self.min, self.max, self.sum, self.count = start, None, 0x7FFF, -0x7FFF, 0, 0
+        self.min = min(self.min, raw)
+        self.max = max(self.max, raw)
+        self.sum += raw
+        self.count += 1
+
+    def record(self):
+        return self.RECORD.pack(self.start, self.min, self.max, self.sum, self.count)
+
+    def flush(self):
+        if self.start is None or not self.count:
+            return
+        with open(self.path, 'r+b' if os.path.exists(self.path) else 'w+b') as f:
+            f.seek(0, os.SEEK_END)
+            end = f.tell() // self.RECORD.size * self.RECORD.size
+            for offset, record in self.closed + [(self.offset, self.record())]:
+                if offset is None:
+                    offset, end = end, end + self.RECORD.size
+                f.seek(offset)
+                f.write(record)
+            self.offset = offset
+        self.closed = []
+
+
+class SensorColumns:
+    def __init__(self, directory, chunk_size, resolutions):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        os.makedirs(directory, exist_ok=True)
+        self.rollups = [Rollup(os.path.join(directory, f'rollup_{resolution}.bin'), resolution) for resolution in resolutions]
+        self.values = array('h')
+        self.times = bytearray()
+        self.chunk = None
+        self.stored = 0
+        self.last_time = 0
+
+    def add(self, timestamp, raw):
+        milliseconds = int(timestamp * 1000)
+        if self.chunk is None or self.stored + len(self.values) >= self.chunk_size:
+            self.flush()
+            self.chunk = os.path.join(self.directory, str(milliseconds))
+            self.stored = 0
+            self.last_time = milliseconds
+        self.values.append(raw)
+        encode_varint(milliseconds - self.last_time, self.times)
+        self.last_time = milliseconds
+        for rollup in self.rollups:
+            rollup.add(timestamp, raw)
+
+    def flush(self):
+        if self.values:
+            with open(self.chunk + '.values', 'ab') as f:
+                self.values.tofile(f)
+            with open(self.chunk + '.times', 'ab') as f:
+                f.write(self.times)
+            self.stored += len(self.values)
+            self.values = array('h')
+            self.times = bytearray()
+        for rollup in self.rollups:
+            rollup.flush()
+
+    def close(self):
+        self.flush()
+
+
+class ColumnStore:
+    RESOLUTIONS = (60, 3600)
+
+    def __init__(self, directory, chunk_size=65536, flush_period=60):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.flush_period = flush_period
+        self.sensors = {}
+        self.next_flush = monotonic() + flush_period
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, records):
+        timestamp = time()
+        for rom, value in records:
+            raw = HistoryFile.encode(value)
+            if raw == HistoryFile.NO_VALUE:
+                continue
+            if rom not in self.sensors:
+                self.sensors[rom] = SensorColumns(os.path.join(self.directory, str(rom)), self.chunk_size, self.RESOLUTIONS)
+            self.sensors[rom].add(timestamp, raw)
+        if monotonic() >= self.next_flush:
+            self.flush()
+
+    def flush(self):
+        self.next_flush = monotonic() + self.flush_period
+        for columns in self.sensors.values():
+            columns.flush()
+
+    def close(self):
+        for columns in self.sensors.values():
+            columns.close()
+
+
+class ColumnReader:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def sensors(self):
+        return sorted(int(name) for name in os.listdir(self.directory) if name.isdigit())
+
+    def chunks(self, rom):
+        directory = os.path.join(self.directory, str(rom))
+        return sorted(int(name[:-7]) for name in os.listdir(directory) if name.endswith('.values'))
+
+    def load_chunk(self, rom, chunk, cache=None):
+        if cache is not None and (rom, chunk) in cache:
+            return cache[rom, chunk]
+        directory = os.path.join(self.directory, str(rom))
+        values = array('h')
+        with open(os.path.join(directory, f'{chunk}.values'), 'rb') as f:
+            values.frombytes(f.read())
+        with open(os.path.join(directory, f'{chunk}.times'), 'rb') as f:
+            deltas = decode_varints(f.read())
+        times = array('d')
+        milliseconds = chunk
+        for delta in deltas[:len(values)]:
+            milliseconds += delta
+            times.append(milliseconds / 1000)
+        if cache is not None:
+            cache[rom, chunk] = times, values
+        return times, values
+
+    def samples(self, rom, start=None, end=None, cache=None):
+        chunks = self.chunks(rom)
+        first = 0 if start is None else max(bisect.bisect_right(chunks, int(start * 1000)) - 1, 0)
+        times, values = array('d'), array('h')
+        for chunk in chunks[first:]:
+            if end is not None and chunk >= end * 1000:
+                break
+            chunk_times, chunk_values = self.load_chunk(rom, chunk, cache)
+            low = 0 if start is None else bisect.bisect_left(chunk_times, start)
+            high = len(chunk_times) if end is None else bisect.bisect_left(chunk_times, end)
+            times.extend(chunk_times[low:high])
+            values.extend(chunk_values[low:high])
+        return times, values
+
+    def rollups(self, rom, resolution, start=None, end=None):
+        path = os.path.join(self.directory, str(rom), f'rollup_{resolution}.bin')
+        if not os.path.exists(path) or os.path.getsize(path) < Rollup.RECORD.size:
+            return []
+        buckets = []
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            count = len(data) // Rollup.RECORD.size
+            index = 0 if start is None else search_sorted(count, start, lambda index: Rollup.RECORD.unpack_from(data, index * Rollup.RECORD.size)[0])
+            while index < count:
+                bucket_start, low, high, total, samples = Rollup.RECORD.unpack_from(data, index * Rollup.RECORD.size)
+                index += 1
+                if end is not None and bucket_start + resolution > end:
+                    break
+                if buckets and buckets[-1][0] == bucket_start:
+                    previous = buckets[-1]
+                    buckets[-1] = (bucket_start, min(previous[1], low), max(previous[2], high), previous[3] + total, previous[4] + samples)
+                else:
+                    buckets.append((bucket_start, low, high, total, samples))
+        return buckets
+
+    def rollup_end(self, rom, resolution):
+        path = os.path.join(self.directory, str(rom), f'rollup_{resolution}.bin')
+        if not os.path.exists(path) or os.path.getsize(path) < Rollup.RECORD.size:
+            return None
+        with open(path, 'rb') as f:
+            f.seek((os.path.getsize(path) // Rollup.RECORD.size - 1) * Rollup.RECORD.size)
+            return Rollup.RECORD.unpack(f.read(Rollup.RECORD.size))[0] + resolution
+
+    def cover(self, rom, start, end, resolutions, cache=None):
+        if start >= end:
+            return []
+        if not resolutions:
+            times, values = self.samples(rom, start, end, cache)
+            return [(start, min(values), max(values), sum(values), len(values))] if values else []
+        resolution = resolutions[0]
+        low = math.ceil(start / resolution) * resolution
+        high = min(end // resolution * resolution, self.rollup_end(rom, resolution) or low)
+        if low >= high:
+            return self.cover(rom, start, end, resolutions[1:], cache)
+        return self.cover(rom, start, low, resolutions[1:], cache) + self.rollups(rom, resolution, low, high) + self.cover(rom, high, end, resolutions[1:], cache)
+
+    def summary(self, rom, start, end):
+        parts = self.cover(rom, start, end, sorted(ColumnStore.RESOLUTIONS, reverse=True), {})
+        count = sum(part[4] for part in parts)
+        if not count:
+            return None
+        return dict(
+            min=min(part[1] for part in parts) / HistoryFile.SCALE,
+            max=max(part[2] for part in parts) / HistoryFile.SCALE,
+            mean=sum(part[3] for part in parts) / count / HistoryFile.SCALE,
+            count=count,
+        )
+
+
+REPORT_PERCENTILES = (5, 50, 95)
+REPORT_MAX_BINS = 20000
+REPORT_GAP_FACTOR = 1.5
+
+
+def history_records(numpy, path, start=None, end=None, sensors=None):
+    dtype = numpy.dtype([('time', '<f8'), ('rom', '<u8'), ('raw', '<i2'), ('status', 'u1'), ('ok', 'u1')])
+    parts = []
+    for segment, count in HistoryReader(path).counts():
+        if not count:
+            continue
+        records = numpy.memmap(segment, dtype=dtype, mode='r', offset=HistoryFile.HEADER_SIZE, shape=(count,))
+        first = 0 if start is None else numpy.searchsorted(records['time'], start, 'left')
+        last = count if end is None else numpy.searchsorted(records['time'], end, 'left')
+        records = records[first:last]
+        if sensors:
+            records = records[numpy.isin(records['rom'], numpy.array(sensors, dtype='<u8'))]
+        if len(records):
+            parts.append(numpy.array(records))
+    return numpy.concatenate(parts) if parts else numpy.empty(0, dtype)
+
+
+def group_percentiles(numpy, values, groups, size, percentiles):
+    order = numpy.lexsort((values, groups))
+    values = values[order]
+    counts = numpy.bincount(groups, minlength=size)
+    starts = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+    result = numpy.full((len(percentiles), size), numpy.nan)
+    present = counts > 0
+    for index, percentile in enumerate(percentiles):
+        position = starts[present] + (counts[present] - 1) * percentile / 100
+        low = numpy.floor(position).astype(numpy.int64)
+        high = numpy.ceil(position).astype(numpy.int64)
+        result[index, present] = values[low] + (values[high] - values[low]) * (position - low)
+    return result
+
+
+def group_reduce(numpy, function, values, starts, present):
+    result = numpy.full(len(starts), numpy.nan)
+    if present.any():
+        result[present] = function.reduceat(values, starts[present])
+    return result
+
+
+def history_report(numpy, records, step=60):
+    records = records[numpy.lexsort((records['time'], records['rom']))]
+    roms, inverse = numpy.unique(records['rom'], return_inverse=True)
+    size = len(roms)
+    failures = numpy.bincount(inverse, weights=records['ok'] == 0, minlength=size)
+    valid = (records['ok'] == 1) & (records['raw'] != HistoryFile.NO_VALUE)
+    groups = inverse[valid]
+    times = records['time'][valid]
+    values = records['raw'][valid] / HistoryFile.SCALE
+    counts = numpy.bincount(groups, minlength=size)
+    starts = numpy.concatenate(([0], numpy.cumsum(counts)[:-1]))
+    present = counts > 0
+    report = dict(rom=roms, count=counts, failures=failures.astype(numpy.int64))
+    report['mean'] = numpy.bincount(groups, weights=values, minlength=size) / numpy.where(present, counts, 1)
+    report['mean'][~present] = numpy.nan
+    report['min'] = group_reduce(numpy, numpy.minimum, values, starts, present)
+    report['max'] = group_reduce(numpy, numpy.maximum, values, starts, present)
+    for percentile, row in zip(REPORT_PERCENTILES, group_percentiles(numpy, values, groups, size, REPORT_PERCENTILES)):
+        report[f'p{percentile}'] = row
+
+    same = numpy.zeros(len(values), dtype=bool)
+    same[1:] = groups[1:] == groups[:-1]
+    intervals = numpy.full(len(values), numpy.nan)
+    intervals[1:] = numpy.diff(times)
+    intervals[~same] = numpy.nan
+    rates = numpy.full(len(values), numpy.nan)
+    moving = same & (intervals > 0)
+    rates[moving] = numpy.diff(values, prepend=numpy.nan)[moving] / intervals[moving] * 60
+    report['rate_min'] = group_reduce(numpy, numpy.fmin, rates, starts, present)
+    report['rate_max'] = group_reduce(numpy, numpy.fmax, rates, starts, present)
+    report['interval'] = group_percentiles(numpy, intervals[same], groups[same], size, (50,))[0]
+    expected = report['interval'][groups]
+    gaps = same & (intervals > expected * REPORT_GAP_FACTOR)
+    report['gaps'] = numpy.bincount(groups[gaps], minlength=size)
+    report['missed'] = numpy.bincount(groups[gaps], weights=numpy.round(intervals[gaps] / expected[gaps]) - 1, minlength=size).astype(numpy.int64)
+    report['max_gap'] = group_reduce(numpy, numpy.fmax, intervals, starts, present)
+
+    if len(times):
+        step = max(step, (times.max() - times.min()) / REPORT_MAX_BINS)
+        bins = ((times - times.min()) // step).astype(numpy.int64)
+        cells = bins * size + groups
+        length = (bins.max() + 1) * size
+        sums = numpy.bincount(cells, weights=values, minlength=length).reshape(-1, size)
+        filled = numpy.bincount(cells, minlength=length).reshape(-1, size)
+        mask = (filled > 0).astype(numpy.float64)
+        grid = numpy.where(filled > 0, sums / numpy.maximum(filled, 1), 0)
+        pairs = mask.T @ mask
+        sum_x = grid.T @ mask
+        sum_xx = (grid * grid).T @ mask
+        sum_xy = grid.T @ grid
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            correlation = (pairs * sum_xy - sum_x * sum_x.T) / numpy.sqrt((pairs * sum_xx - sum_x ** 2) * (pairs * sum_xx.T - sum_x.T ** 2))
+        correlation[pairs < 3] = numpy.nan
+        report['correlation'] = correlation
+        report['step'] = step
+    return report
+
+
+def print_report(path, start=None, end=None, sensors=None, step=60, top=10):
+    try:
+        import numpy
+    except ImportError:
+        print('Для построения отчёта необходим пакет numpy: pip install numpy', file=sys.stderr)
+        return False
+    records = history_records(numpy, path, start, end, sensors)
+    if not len(records):
+        print(f'В файле истории "{path}" нет записей за указанный интервал')
+        return False
+    report = history_report(numpy, records, step)
+    print('=' * 40)
+    print(f'Записей: {len(records)}, датчиков: {len(report["rom"])}, интервал: {format_date(records["time"].min())} - {format_date(records["time"].max())}')
+    print(f'{"Датчик":>20}  {"Показаний":>9}  {"Ошибок":>6}  {"Мин.":>7}  ' + '  '.join(f'{f"p{percentile}":>7}' for percentile in REPORT_PERCENTILES) + f'  {"Макс.":>7}  {"Среднее":>7}  {"°C/мин":>15}  {"Период":>7}  {"Пропусков":>9}  {"Пропущено":>9}  {"Макс. пауза":>11}')
+    for index, rom in enumerate(report['rom']):
+        print(f'{rom:>20}  {report["count"][index]:>9}  {report["failures"][index]:>6}  {report["min"][index]:>7.3f}  ' + '  '.join(f'{report[f"p{percentile}"][index]:>7.3f}' for percentile in REPORT_PERCENTILES) + f'  {report["max"][index]:>7.3f}  {report["mean"][index]:>7.3f}  {report["rate_min"][index]:>7.3f}/{report["rate_max"][index]:<7.3f}  {report["interval"][index]:>7.1f}  {report["gaps"][index]:>9}  {report["missed"][index]:>9}  {report["max_gap"][index]:>11.1f}')
+    if 'correlation' in report and len(report['rom']) > 1:
+        upper = numpy.triu_indices(len(report['rom']), 1)
+        values = report['correlation'][upper]
+        order = numpy.argsort(values)
+        order = order[~numpy.isnan(values[order])]
+        print(f'Корреляция средних значений за {report["step"]:.0f} сек.:')
+        for title, selection in (('наибольшая', order[::-1][:top]), ('наименьшая', order[:top])):
+            print(f'  {title}:')
+            for index in selection:
+                print(f'    {report["rom"][upper[0][index]]} - {report["rom"][upper[1][index]]}: {values[index]:.3f}')
+    print('=' * 40)
+    return True
+
+
+def format_date(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime('%d.%m.%Y %H:%M:%S')
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%d.%m.%Y %H:%M:%S').timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Вывод записей из файла истории температуры или таблицы последних показаний.')
+    parser.add_argument('path', type=str, help='Путь до файла истории')
+    parser.add_argument('-l', '--latest', action='store_true', help='Вывести снимок таблицы последних показаний, указанной в path')
+    parser.add_argument('-r', '--report', action='store_true', help='Вывести статистику по датчикам за интервал (необходим пакет numpy)')
+    parser.add_argument('--step', type=float, default=60, help='Вместе с ключом -r: шаг усреднения для расчёта корреляции, сек.')
+    parser.add_argument('-f', '--start', type=parse_date, default=None, help='Начало интервала, "ДД.ММ.ГГГГ ЧЧ:ММ:СС"')
+    parser.add_argument('-t', '--end', type=parse_date, default=None, help='Конец интервала (не включая), "ДД.ММ.ГГГГ ЧЧ:ММ:СС"')
+    parser.add_argument('-s', '--sensor', type=int, action='append', default=None, help='Адрес датчика (можно указать несколько раз)')
+    args = parser.parse_args()
+    if args.latest:
+        timestamp, readings = LatestReader(args.path).snapshot()
+        print(f'[{format_date(timestamp)}]> ' + ' '.join(f'{rom}={value}' + ('' if status == 'healthy' else f'({status})') for rom, (value, status, ok, updated) in readings.items()))
+        return
+    if args.report:
+        sys.exit(0 if print_report(args.path, args.start, args.end, args.sensor, args.step) else 1)
+    for timestamp, rom, value, status, ok in HistoryReader(args.path).read(args.start, args.end, args.sensor):
+        print(f'[{format_date(timestamp)}] {rom}={value}' + ('' if status == 'healthy' else f'({status})') + ('' if ok else ' !'))
+
+
+if __name__ == '__main__':
+    main()
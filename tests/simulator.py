@@ -0,0 +1,34 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import RodosSimulator
+
+sys.modules['hid'] = RodosSimulator
+
+from TempScanner import RODOS_HID, Config
+
+
+def configure(sensor_list, completion_polling=True, idle=False, **options):
+    Config.ARGUMENTS = argparse.Namespace(idle=idle, verbose=False, log_level='WARNING', rescan=False, config='', show=False, pipeline=False)
+    Config._load_from_dict(dict({
+        'sensor_list': sensor_list,
+        'temp_file_path': os.path.join(tempfile.mkdtemp(), 'SSI.temp'),
+        'loggers': [],
+        'reading_period': Config.DEFAULT_READING_PERIOD,
+        'temp_currency': Config.DEFAULT_TEMP_CURRENCY,
+        'completion_polling': completion_polling,
+    }, **options))
+    Config.CONFIG_FILE_PATH = ''
+
+
+def open_bus(count, families=(RodosSimulator.FAMILY_DS18B20,), seed=1, adapters=1, stale_reports=False, **options):
+    buses, _ = RodosSimulator.attach_buses(count, families, seed, 0.0005, adapters, stale_reports)
+    configure([sensor.rom for bus in buses for sensor in bus.sensors], **options)
+    return buses, RODOS_HID.open_all()
+
+
+def convert(session, level=3):
+    session.skip_rom_convert()
+    session.wait_conversion(level)
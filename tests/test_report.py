@@ -0,0 +1,109 @@
+import io
+import math
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import TempStorage
+from TempStorage import HistoryFile, history_records, history_report, print_report, REPORT_PERCENTILES, REPORT_GAP_FACTOR
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def percentile(values, rank):
+    values = sorted(values)
+    position = rank / 100 * (len(values) - 1)
+    low, high = math.floor(position), math.ceil(position)
+    return values[low] + (values[high] - values[low]) * (position - low)
+
+
+def pearson(pairs):
+    if len(pairs) < 3:
+        return float('nan')
+    mean_x = sum(x for x, y in pairs) / len(pairs)
+    mean_y = sum(y for x, y in pairs) / len(pairs)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in pairs)
+    return covariance / math.sqrt(sum((x - mean_x) ** 2 for x, y in pairs) * sum((y - mean_y) ** 2 for x, y in pairs))
+
+
+@unittest.skipUnless(numpy, 'numpy is not installed')
+class HistoryReportTest(unittest.TestCase):
+    START = 1790000000.0
+    PERIOD = 10
+    STEPS = 400
+    STEP = 60
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'SSI.history')
+        self.samples = {1: [], 2: [], 3: []}
+        self.failures = {1: 0, 2: 0, 3: 0}
+        history = HistoryFile(self.path)
+        for index in range(self.STEPS):
+            timestamp = self.START + index * self.PERIOD + 0.1
+            values = {1: 20 + 5 * math.sin(index / 20), 2: 30 - 2 * math.sin(index / 20) + (index % 7) / 16, 3: 10 + (index * 37 % 11) / 4}
+            records = []
+            for rom, value in values.items():
+                if rom == 1 and 100 <= index < 104 or rom == 3 and index in (200, 300, 301):
+                    continue
+                if rom == 2 and index % 50 == 0:
+                    records.append((rom, None, 'degraded', False))
+                    self.failures[rom] += 1
+                    continue
+                records.append((rom, value, 'healthy', True))
+                self.samples[rom].append((timestamp, HistoryFile.decode(HistoryFile.encode(value))))
+            with mock.patch.object(TempStorage, 'time', return_value=timestamp):
+                history.append(records)
+        history.close()
+
+    def test_matches_brute_force(self):
+        report = history_report(numpy, history_records(numpy, self.path), self.STEP)
+        self.assertEqual(list(report['rom']), [1, 2, 3])
+        start = min(timestamp for samples in self.samples.values() for timestamp, value in samples)
+        bins = {}
+        for index, (rom, samples) in enumerate(self.samples.items()):
+            values = [value for timestamp, value in samples]
+            intervals = [b[0] - a[0] for a, b in zip(samples, samples[1:])]
+            rates = [(b[1] - a[1]) / (b[0] - a[0]) * 60 for a, b in zip(samples, samples[1:])]
+            interval = percentile(intervals, 50)
+            gaps = [gap for gap in intervals if gap > interval * REPORT_GAP_FACTOR]
+            self.assertEqual((report['count'][index], report['failures'][index]), (len(values), self.failures[rom]))
+            self.assertAlmostEqual(report['mean'][index], sum(values) / len(values))
+            self.assertEqual((report['min'][index], report['max'][index]), (min(values), max(values)))
+            for rank in REPORT_PERCENTILES:
+                self.assertAlmostEqual(report[f'p{rank}'][index], percentile(values, rank))
+            self.assertAlmostEqual(report['rate_min'][index], min(rates))
+            self.assertAlmostEqual(report['rate_max'][index], max(rates))
+            self.assertAlmostEqual(report['interval'][index], interval)
+            self.assertEqual(report['gaps'][index], len(gaps))
+            self.assertEqual(report['missed'][index], sum(round(gap / interval) - 1 for gap in gaps))
+            self.assertAlmostEqual(report['max_gap'][index], max(intervals))
+            cells = {}
+            for timestamp, value in samples:
+                cells.setdefault(int((timestamp - start) // self.STEP), []).append(value)
+            bins[rom] = {cell: sum(values) / len(values) for cell, values in cells.items()}
+        self.assertEqual((report['gaps'][0], report['missed'][0]), (1, 4))
+        self.assertEqual((report['gaps'][2], report['missed'][2]), (2, 3))
+        for i, a in enumerate(self.samples):
+            for j, b in enumerate(self.samples):
+                expected = pearson([(bins[a][cell], bins[b][cell]) for cell in bins[a] if cell in bins[b]])
+                self.assertAlmostEqual(report['correlation'][i, j], expected)
+        self.assertLess(report['correlation'][0, 1], -0.9)
+
+    def test_time_range_and_print(self):
+        records = history_records(numpy, self.path, self.START + 1000, self.START + 2000)
+        self.assertTrue(all(self.START + 1000 <= timestamp < self.START + 2000 for timestamp in records['time']))
+        self.assertEqual(len(records), sum(1 for samples in self.samples.values() for timestamp, value in samples if self.START + 1000 <= timestamp < self.START + 2000) + 2)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertTrue(print_report(self.path))
+            self.assertFalse(print_report(self.path, self.START - 100, self.START - 50))
+        self.assertIn('Корреляция', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
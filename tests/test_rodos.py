@@ -0,0 +1,307 @@
+import unittest
+from time import monotonic, sleep
+
+from .simulator import RodosSimulator, open_bus, convert
+from TempScanner import RODOS_HID, TemperatureScanner, Config
+
+
+class SearchRomTest(unittest.TestCase):
+    def test_full_search_finds_every_sensor(self):
+        buses, sessions = open_bus(12, (0x28, 0x22, 0x10))
+        self.assertTrue(sessions[0].search_sensors())
+        self.assertEqual(sorted(sessions[0].sensors), sorted(sensor.rom for sensor in buses[0].sensors))
+
+    def test_family_search_finds_only_that_family(self):
+        buses, sessions = open_bus(12, (0x28, 0x22, 0x10))
+        self.assertTrue(sessions[0].search_sensors(0x10))
+        self.assertEqual(sorted(sessions[0].sensors), sorted(sensor.rom for sensor in buses[0].sensors if sensor.family == 0x10))
+
+    def test_prefix_search_stays_in_its_branch(self):
+        buses, sessions = open_bus(12)
+        ROM = buses[0].sensors[3].rom
+        MASK = (1 << 12) - 1
+        self.assertTrue(sessions[0].search_rom(ROM & MASK, 12))
+        self.assertEqual(sorted(sessions[0].sensors), sorted(sensor.rom for sensor in buses[0].sensors if (sensor.rom ^ ROM) & MASK == 0))
+
+    def test_missing_family_is_not_found(self):
+        buses, sessions = open_bus(4)
+        self.assertFalse(sessions[0].search_rom(0x10))
+        self.assertEqual(sessions[0].sensors, [])
+
+
+class AlarmSearchTest(unittest.TestCase):
+    def test_finds_only_sensors_out_of_thresholds(self):
+        buses, sessions = open_bus(6)
+        session = sessions[0]
+        temperatures = (35.0, 20.0, 5.0, 20.0, 29.0, 11.0)
+        for sensor, temperature in zip(buses[0].sensors, temperatures):
+            sensor.temperature = temperature
+        ROMS = [sensor.rom for sensor in buses[0].sensors]
+        self.assertEqual(sorted(session.set_alarm_thresholds({ROM: (30, 10) for ROM in ROMS})), sorted(ROMS))
+        convert(session)
+        self.assertTrue(session.alarm_search(ROMS))
+        self.assertEqual(sorted(session.alarm_sensors), sorted(ROMS[index] for index in (0, 2)))
+
+    def test_no_alarm(self):
+        buses, sessions = open_bus(6)
+        ROMS = [sensor.rom for sensor in buses[0].sensors]
+        sessions[0].set_alarm_thresholds({ROM: (125, -55) for ROM in ROMS})
+        convert(sessions[0])
+        self.assertTrue(sessions[0].alarm_search(ROMS))
+        self.assertEqual(sessions[0].alarm_sensors, [])
+
+    def test_expired_cycle_budget_falls_back_to_full_read(self):
+        buses, sessions = open_bus(4, alarm_monitoring=dict(enabled=True, sweep_period=60), retry_policy=dict(cycle_budget=0.3))
+        Config.SENSOR_OPTIONS = {sensor: dict(th=30, tl=10) for sensor in Config.SENSOR_LIST}
+        scanner = TemperatureScanner(sessions)
+        self.assertEqual(scanner.armed, set(Config.SENSOR_LIST))
+        scanner.get_temperature()
+        scanner.get_temperature()
+        session = sessions[0]
+        session.retry.start_cycle()
+        sleep(0.31)
+        self.assertFalse(session.alarm_search(Config.SENSOR_LIST))
+        self.assertEqual(scanner.alarm_filter(session, Config.SENSOR_LIST), Config.SENSOR_LIST)
+        session.retry.stop_cycle()
+
+
+class AdapterTest(unittest.TestCase):
+    def test_completion_polling(self):
+        buses, sessions = open_bus(1)
+        start_time = monotonic()
+        self.assertTrue(sessions[0].ow_reset())
+        self.assertLess(monotonic() - start_time, 10/1000)
+
+    def test_completion_polling_timeout(self):
+        buses, sessions = open_bus(1, retry_policy=dict(attempts=1))
+        RodosSimulator._ADAPTERS[0].latency = 2 * sessions[0].POLL_TIMEOUT
+        sessions[0].load_report(sessions[0].OW_REPORTS[0x48])
+        self.assertTrue(sessions[0].set_feature())
+        self.assertFalse(sessions[0].wait_feature(0))
+
+    def test_adapter_clearing_busy_reports_is_polled(self):
+        buses, sessions = open_bus(1)
+        self.assertFalse(sessions[0].stale_reports)
+
+    def test_stale_busy_reports_use_fixed_wait_for_repeated_commands(self):
+        buses, sessions = open_bus(4, stale_reports=True)
+        session = sessions[0]
+        self.assertTrue(session.stale_reports)
+        session.sensors = []
+        self.assertTrue(session.search_sensors())
+        self.assertEqual(sorted(session.sensors), sorted(sensor.rom for sensor in buses[0].sensors))
+        for index, sensor in enumerate(buses[0].sensors):
+            sensor.temperature = 20.0 + index
+        convert(session)
+        for index, sensor in enumerate(buses[0].sensors):
+            self.assertTrue(session.get_temperature(sensor.rom))
+            self.assertEqual(session.TEMPERATURE_LOG[sensor.rom], 20.0 + index)
+
+    def test_fixed_delays(self):
+        buses, sessions = open_bus(2, completion_polling=False)
+        convert(sessions[0])
+        for sensor in buses[0].sensors:
+            self.assertTrue(sessions[0].get_temperature(sensor.rom))
+
+
+class ConversionWaitTest(unittest.TestCase):
+    def setUp(self):
+        self.buses, self.sessions = open_bus(2)
+        self.session = self.sessions[0]
+        for sensor in self.buses[0].sensors:
+            self.assertTrue(self.session.check_registers(sensor.rom, 0, copy=False))
+
+    def test_busy_bit_ends_wait_early(self):
+        self.assertTrue(self.session.skip_rom_convert())
+        self.assertTrue(self.session.wait_conversion(3))
+        self.assertLess(monotonic() - self.session.conversion_start, self.session.CONVERSION_TIMES[1])
+
+    def test_parasite_power_waits_full_time(self):
+        self.session.parasite_power = True
+        self.assertTrue(self.session.skip_rom_convert())
+        self.assertFalse(self.session.wait_conversion(2))
+        self.assertGreaterEqual(monotonic() - self.session.conversion_start, self.session.CONVERSION_TIMES[2])
+
+    def test_bus_reset_during_conversion_waits_full_time(self):
+        self.assertTrue(self.session.skip_rom_convert())
+        self.session.ow_reset()
+        self.assertFalse(self.session.wait_conversion(1))
+        self.assertGreaterEqual(monotonic() - self.session.conversion_start, self.session.CONVERSION_TIMES[1])
+
+
+class RegistersTest(unittest.TestCase):
+    def test_eeprom_written_only_when_registers_differ(self):
+        buses, sessions = open_bus(3, (0x28, 0x28, 0x10))
+        levels = {sensor.rom: 1 for sensor in buses[0].sensors}
+        self.assertEqual(sessions[0].set_temperature_currency(levels), levels)
+        self.assertEqual([sensor.eeprom_writes for sensor in buses[0].sensors], [1, 1, 0])
+        self.assertEqual([sensor.resolution for sensor in buses[0].sensors], [1, 1, 3])
+        self.assertEqual(sessions[0].set_temperature_currency(levels), levels)
+        self.assertEqual([sensor.eeprom_writes for sensor in buses[0].sensors], [1, 1, 0])
+
+    def test_scratchpad_only_write(self):
+        buses, sessions = open_bus(1)
+        sensor = buses[0].sensors[0]
+        self.assertTrue(sessions[0].check_registers(sensor.rom, 0, copy=False))
+        self.assertEqual((sensor.resolution, sensor.eeprom_writes, sensor.eeprom[2] >> 5 & 0x03), (0, 0, 3))
+
+    def test_scanner_skips_verified_sensors(self):
+        buses, sessions = open_bus(2)
+        TemperatureScanner(sessions)
+        resets = RodosSimulator._ADAPTERS[0].bus.resets
+        TemperatureScanner(sessions)
+        self.assertEqual(RodosSimulator._ADAPTERS[0].bus.resets, resets)
+
+
+class DiscoveryTest(unittest.TestCase):
+    def test_reports_added_and_missing_sensors(self):
+        buses, sessions = open_bus(10)
+        ROMS = [sensor.rom for sensor in buses[0].sensors]
+        ghost = RodosSimulator.make_rom(0x28, 999)
+        self.assertTrue(sessions[0].discover_sensors(ROMS[1:] + [ghost]))
+        self.assertEqual(sessions[0].discovered, [ROMS[0]])
+        self.assertEqual(sessions[0].missing, [ghost])
+        self.assertEqual(sorted(sessions[0].sensors), sorted(ROMS))
+
+    def test_unchanged_bus(self):
+        buses, sessions = open_bus(10)
+        ROMS = [sensor.rom for sensor in buses[0].sensors]
+        self.assertTrue(sessions[0].discover_sensors(ROMS))
+        self.assertEqual((sessions[0].discovered, sessions[0].missing), ([], []))
+
+    def test_empty_bus_reports_every_sensor_missing(self):
+        buses, sessions = open_bus(2)
+        ROMS = [sensor.rom for sensor in buses[0].sensors]
+        for ROM in ROMS:
+            buses[0].remove(ROM)
+        self.assertTrue(sessions[0].discover_sensors(ROMS))
+        self.assertEqual(sessions[0].missing, ROMS)
+
+    def test_probe_without_attempts_fails(self):
+        buses, sessions = open_bus(2, retry_policy=dict(cycle_budget=0.01))
+        sessions[0].retry.start_cycle()
+        sleep(0.02)
+        self.assertFalse(sessions[0].discover_sensors(Config.SENSOR_LIST))
+        sessions[0].retry.stop_cycle()
+
+    def test_sensors_are_assigned_to_buses_by_probing(self):
+        buses, sessions = open_bus(8, adapters=2)
+        count_transfers = lambda: sum(adapter.transfers for adapter in RodosSimulator._ADAPTERS)
+        start = count_transfers()
+        scanner = TemperatureScanner(sessions)
+        probing = count_transfers() - start
+        self.assertEqual([sorted(sensors) for session, sensors in scanner.buses], [sorted(sensor.rom for sensor in bus.sensors) for bus in buses])
+        start = count_transfers()
+        for session in sessions:
+            session.sensors = []
+            session.search_sensors()
+        self.assertLess(probing, count_transfers() - start)
+
+    def test_scanner_applies_changes_per_bus(self):
+        buses, sessions = open_bus(2, adapters=2)
+        scanner = TemperatureScanner(sessions)
+        removed = buses[0].sensors[0].rom
+        added = buses[1].add(RodosSimulator.VirtualSensor(rom=RodosSimulator.make_rom(0x28, 77))).rom
+        buses[0].remove(removed)
+        Config.SENSOR_DISCOVERY = dict(Config.DEFAULT_SENSOR_DISCOVERY, remove_missing=True)
+        scanner.discover_sensors()
+        self.assertIn(added, Config.SENSOR_LIST)
+        self.assertNotIn(removed, Config.SENSOR_LIST)
+        self.assertIn(added, scanner.buses[1][1])
+
+
+class DecodeTest(unittest.TestCase):
+    def test_decode_scratchpad(self):
+        session = RODOS_HID(None)
+        for family, resolution, temperature, expected in ((0x28, 3, -10.125, -10.125), (0x28, 3, 21.5, 21.5), (0x28, 0, -10.125, -10.5), (0x22, 3, 85.0, 85.0), (0x10, 3, -0.5, -0.5), (0x10, 3, -25.0, -25.0)):
+            sensor = RodosSimulator.VirtualSensor(rom=RodosSimulator.make_rom(family, 1))
+            sensor.config = (resolution << 5) | 0x1F
+            sensor.raw = sensor.encode_temperature(temperature)
+            scratchpad = bytes(sensor.scratchpad())
+            self.assertEqual(session.crc8_block(scratchpad), 0)
+            self.assertEqual(session.decode_temperature(family, scratchpad), expected)
+
+    def test_read_negative_temperatures(self):
+        buses, sessions = open_bus(3, (0x28, 0x22, 0x10))
+        for sensor, temperature in zip(buses[0].sensors, (-10.125, -55.0, -0.5)):
+            sensor.temperature = temperature
+        convert(sessions[0])
+        for sensor, temperature in zip(buses[0].sensors, (-10.125, -55.0, -0.5)):
+            self.assertTrue(sessions[0].get_temperature(sensor.rom))
+            self.assertEqual(sessions[0].TEMPERATURE_LOG[sensor.rom], temperature)
+
+    def test_single_drop_is_confirmed_by_read_rom_only(self):
+        buses, sessions = open_bus(2)
+        session = sessions[0]
+        session.TEMPERATURE_LOG[buses[0].sensors[1].rom] = 21.5
+        transfers = RodosSimulator._ADAPTERS[0].transfers
+        self.assertFalse(session.enable_single_drop(buses[0].sensors[0].rom))
+        self.assertLessEqual(RodosSimulator._ADAPTERS[0].transfers - transfers, 4)
+        self.assertEqual(session.TEMPERATURE_LOG[buses[0].sensors[1].rom], 21.5)
+        buses[0].sensors[1].present = False
+        self.assertTrue(session.enable_single_drop(buses[0].sensors[0].rom))
+
+    def test_crc_error_on_single_drop_bus_keeps_scratchpad_value(self):
+        buses, sessions = open_bus(1, retry_policy=dict(attempts=1))
+        sensor = buses[0].sensors[0]
+        sensor.temperature = 21.5
+        session = sessions[0]
+        convert(session)
+        self.assertTrue(session.enable_single_drop(sensor.rom))
+        sensor.crc_errors = 1
+        self.assertFalse(session.get_temperature(sensor.rom))
+        self.assertAlmostEqual(session.TEMPERATURE_LOG[sensor.rom], 21.5, delta=0.1)
+
+
+class PipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.buses, self.sessions = open_bus(4)
+        self.session = self.sessions[0]
+        self.scanner = TemperatureScanner(self.sessions)
+        self.sensors = list(Config.SENSOR_LIST)
+
+    def tick(self):
+        sleep(self.session.CONVERSION_TIMES[3])
+        self.scanner.fresh = {}
+        self.scanner.scan_bus_pipelined(self.session, self.sensors)
+
+    def test_reads_previous_conversion_and_starts_next(self):
+        self.scanner.scan_bus_pipelined(self.session, self.sensors)
+        self.assertTrue(self.session.conversion_pending)
+        for sensor in self.buses[0].sensors:
+            sensor.temperature = 30.0
+        self.tick()
+        self.assertTrue(all(self.scanner.fresh[sensor] for sensor in self.sensors))
+        self.assertTrue(self.session.conversion_pending)
+        self.assertEqual({self.session.TEMPERATURE_LOG[sensor] for sensor in self.sensors}, {30.0})
+
+    def test_failed_conversion_is_not_read_as_fresh(self):
+        self.scanner.scan_bus_pipelined(self.session, self.sensors)
+        write_byte = self.session.ow_write_byte
+        self.session.ow_write_byte = lambda B: False if B == 0x44 else write_byte(B)
+        self.tick()
+        self.session.ow_write_byte = write_byte
+        for sensor in self.buses[0].sensors:
+            sensor.temperature = 40.0
+        self.tick()
+        self.assertEqual(self.scanner.fresh, {sensor: False for sensor in self.sensors})
+        self.tick()
+        self.assertEqual({self.session.TEMPERATURE_LOG[sensor] for sensor in self.sensors}, {40.0})
+
+    def test_conversion_started_after_cycle_budget(self):
+        self.session.retry.cycle_budget = 0.001
+        self.scanner.scan_bus_pipelined(self.session, self.sensors)
+        self.tick()
+        self.assertTrue(self.session.conversion_pending)
+
+    def test_interrupted_daemon_closes_storage(self):
+        closed = []
+        self.scanner.close_storage = lambda: closed.append(True)
+        self.scanner.get_temperature = lambda buses=None: (_ for _ in ()).throw(KeyboardInterrupt)
+        Config.ARGUMENTS.idle = True
+        self.assertRaises(KeyboardInterrupt, self.scanner.run)
+        self.assertEqual(closed, [True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from time import monotonic, sleep
+
+from . import simulator
+from TempScanner import RetryPolicy, SensorHealth, Scheduler, AdaptiveInterval
+
+
+class RetryPolicyTest(unittest.TestCase):
+    def test_yields_every_attempt_without_budget(self):
+        retry = RetryPolicy(attempts=3)
+        self.assertEqual(list(retry.tries()), [0, 1, 2])
+        self.assertEqual(retry.exhausted, 0)
+
+    def test_expired_cycle_budget_stops_attempts(self):
+        retry = RetryPolicy(attempts=3, cycle_budget=0.01)
+        retry.start_cycle()
+        sleep(0.02)
+        self.assertTrue(retry.cycle_expired())
+        self.assertEqual(list(retry.tries()), [])
+        self.assertEqual(retry.exhausted, 1)
+        retry.stop_cycle()
+        self.assertEqual(list(retry.tries()), [0, 1, 2])
+
+    def test_backoff_is_cut_by_sensor_budget(self):
+        retry = RetryPolicy(attempts=5, backoff=0.02, sensor_budget=0.05)
+        retry.start_sensor()
+        start_time = monotonic()
+        attempts = list(retry.tries())
+        self.assertLess(len(attempts), 5)
+        self.assertLess(monotonic() - start_time, 0.1)
+        self.assertEqual(retry.exhausted, 1)
+
+
+class SensorHealthTest(unittest.TestCase):
+    def test_degrades_quarantines_and_recovers(self):
+        health = SensorHealth(1, degraded_after=1, quarantine_after=3, probe_period=60, recover_after=2)
+        self.assertFalse(health.update(True, 20.0, 0))
+        self.assertTrue(health.update(False, None, 1))
+        self.assertEqual(health.state, SensorHealth.DEGRADED)
+        self.assertEqual(health.reading(), 20.0)
+        health.update(False, None, 2)
+        self.assertTrue(health.update(False, None, 3))
+        self.assertEqual(health.state, SensorHealth.QUARANTINED)
+        self.assertTrue(health.reading() != health.reading())
+        self.assertFalse(health.due(62))
+        self.assertTrue(health.due(63))
+        self.assertEqual(health.state, SensorHealth.PROBING)
+        self.assertFalse(health.update(True, 21.0, 63))
+        self.assertTrue(health.update(True, 21.0, 64))
+        self.assertEqual((health.state, health.reading()), (SensorHealth.HEALTHY, 21.0))
+
+    def test_failed_probe_returns_to_quarantine(self):
+        health = SensorHealth(1, quarantine_after=1, probe_period=10)
+        health.update(False, None, 0)
+        self.assertTrue(health.due(10))
+        health.update(False, None, 10)
+        self.assertEqual((health.state, health.next_probe), (SensorHealth.QUARANTINED, 20))
+
+
+class SchedulerTest(unittest.TestCase):
+    def test_ticks_do_not_drift(self):
+        start_time = monotonic()
+        scheduler = Scheduler(10, start=start_time)
+        self.assertEqual(scheduler.complete(start_time), 0)
+        self.assertEqual(scheduler.next_tick, start_time + 10)
+        self.assertEqual(scheduler.deadline(), start_time + 20)
+
+    def test_overrun_skips_missed_ticks(self):
+        scheduler = Scheduler(0.01, start=monotonic())
+        start_time = monotonic()
+        sleep(0.035)
+        missed = scheduler.complete(start_time)
+        self.assertGreaterEqual(missed, 3)
+        self.assertEqual((scheduler.overruns, scheduler.missed), (1, missed))
+        self.assertGreater(scheduler.next_tick, monotonic())
+
+    def test_percentiles(self):
+        scheduler = Scheduler(1)
+        scheduler.latencies.extend(range(1, 101))
+        self.assertEqual((scheduler.percentile(50), scheduler.percentile(90), scheduler.percentile(99)), (50, 90, 99))
+        self.assertEqual(scheduler.stats()['max'], 100)
+
+
+class AdaptiveIntervalTest(unittest.TestCase):
+    def test_grows_within_deadband(self):
+        adaptive = AdaptiveInterval(1, 2, deadband=0.25, min_interval=1, max_interval=16, growth=2)
+        adaptive.update(20.0, 0)
+        intervals = []
+        for step in range(1, 6):
+            adaptive.update(20.1, step * 100)
+            intervals.append(adaptive.interval)
+        self.assertEqual(intervals, [4, 8, 16, 16, 16])
+        self.assertTrue(adaptive.idle())
+
+    def test_fast_change_drops_to_min_interval(self):
+        adaptive = AdaptiveInterval(1, 16, rate_threshold=0.05, min_interval=1, max_interval=16)
+        adaptive.update(20.0, 0)
+        self.assertTrue(adaptive.update(25.0, 10))
+        self.assertEqual(adaptive.interval, 1)
+        self.assertFalse(adaptive.idle())
+
+    def test_slow_drift_moves_anchor(self):
+        adaptive = AdaptiveInterval(1, 4, deadband=0.25, rate_threshold=0.05, min_interval=1, max_interval=16)
+        adaptive.update(20.0, 0)
+        self.assertFalse(adaptive.update(21.0, 100))
+        self.assertEqual((adaptive.interval, adaptive.anchor), (4, 21.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import math
+import os
+import tempfile
+import unittest
+
+from TempStorage import HistoryFile, HistoryReader, LatestTable, LatestReader, ColumnStore, ColumnReader, SensorColumns, Rollup
+
+
+class HistoryFileTest(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'SSI.history')
+
+    def test_round_trip(self):
+        history = HistoryFile(self.path)
+        history.append([(1, 21.5, 'healthy', True), (2, -10.125, 'degraded', True), (3, None, 'quarantined', False)])
+        history.close()
+        records = list(HistoryReader(self.path).read())
+        self.assertEqual([(rom, value, status, ok) for timestamp, rom, value, status, ok in records[:2]], [(1, 21.5, 'healthy', True), (2, -10.125, 'degraded', True)])
+        self.assertTrue(math.isnan(records[2][2]))
+        self.assertEqual(records[2][3:], ('quarantined', False))
+        self.assertEqual([record[1] for record in HistoryReader(self.path).read(sensors=[2])], [2])
+
+    def test_rotation_and_time_range(self):
+        history = HistoryFile(self.path, file_size=(HistoryFile.HEADER_SIZE + 4 * HistoryFile.RECORD.size) / 1024 / 1024, keep=2)
+        for index in range(10):
+            history.append([(index, float(index), 'healthy', True)])
+        history.close()
+        reader = HistoryReader(self.path)
+        self.assertEqual(len(reader.files), 3)
+        records = list(reader.read())
+        self.assertEqual([record[1] for record in records], list(range(10)))
+        start, end = records[3][0], records[7][0]
+        self.assertEqual([record[1] for record in reader.read(start, end)], [index for index in range(10) if start <= records[index][0] < end])
+
+    def test_reopen_appends(self):
+        HistoryFile(self.path).append([(1, 1.0, 'healthy', True)])
+        history = HistoryFile(self.path)
+        history.append([(2, 2.0, 'healthy', True)])
+        history.close()
+        self.assertEqual([record[1] for record in HistoryReader(self.path).read()], [1, 2])
+
+
+class LatestTableTest(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'SSI.latest')
+
+    def test_round_trip_and_resize(self):
+        table = LatestTable(self.path, 2)
+        reader = LatestReader(self.path)
+        table.publish([(1, 100.0, 21.5, 'healthy', True)])
+        timestamp, readings = reader.snapshot()
+        self.assertEqual(readings, {1: (21.5, 'healthy', True, 100.0)})
+        self.assertFalse(reader.changed())
+        table.publish((rom, 200.0, rom / 16, 'degraded', False) for rom in range(5))
+        self.assertTrue(reader.changed())
+        timestamp, readings = reader.snapshot()
+        self.assertEqual(readings, {rom: (rom / 16, 'degraded', False, 200.0) for rom in range(5)})
+        self.assertEqual(table.sequence % 2, 0)
+        table.close()
+        reader.close()
+
+    def test_reopen_keeps_readings(self):
+        table = LatestTable(self.path, 2)
+        table.publish([(1, 100.0, 21.5, 'healthy', True)])
+        sequence = table.sequence
+        table.close()
+        table = LatestTable(self.path, 2)
+        self.assertEqual(table.sequence, sequence)
+        self.assertEqual(LatestReader(self.path).snapshot()[1], {1: (21.5, 'healthy', True, 100.0)})
+        table.close()
+
+
+class ColumnStoreTest(unittest.TestCase):
+    START = 1790000000.0
+
+    def setUp(self):
+        self.directory = os.path.join(tempfile.mkdtemp(), 'columns')
+
+    def fill(self, period, count):
+        store = ColumnStore(self.directory, chunk_size=4096, flush_period=0)
+        columns = store.sensors[7] = SensorColumns(os.path.join(self.directory, '7'), store.chunk_size, store.RESOLUTIONS)
+        samples = []
+        for index in range(count):
+            timestamp = self.START + index * period + 0.25
+            raw = HistoryFile.encode(20 + 5 * math.sin(index / 50))
+            columns.add(timestamp, raw)
+            samples.append((timestamp, raw))
+        return store, samples
+
+    def test_append_round_trip(self):
+        store = ColumnStore(self.directory, flush_period=0)
+        store.append([(1, 21.5), (2, float('nan')), (1, -0.0625)])
+        store.close()
+        reader = ColumnReader(self.directory)
+        self.assertEqual(reader.sensors(), [1])
+        times, values = reader.samples(1)
+        self.assertEqual([value / HistoryFile.SCALE for value in values], [21.5, -0.0625])
+
+    def test_samples_across_chunks(self):
+        store, samples = self.fill(5, 10000)
+        store.close()
+        reader = ColumnReader(self.directory)
+        self.assertGreater(len(reader.chunks(7)), 1)
+        start, end = samples[1000][0], samples[9000][0]
+        times, values = reader.samples(7, start, end)
+        self.assertEqual(list(values), [raw for timestamp, raw in samples[1000:9000]])
+        self.assertTrue(all(abs(a - b[0]) < 0.002 for a, b in zip(times, samples[1000:9000])))
+
+    def test_summary_matches_raw_samples(self):
+        store, samples = self.fill(120, 30 * 24 * 30)
+        store.flush()
+        reader = ColumnReader(self.directory)
+        loads = []
+        load_chunk = reader.load_chunk
+        reader.load_chunk = lambda rom, chunk, cache=None: loads.append(chunk) or load_chunk(rom, chunk, cache)
+        for start, end in ((self.START + 1234.5, self.START + 29 * 86400 + 77.7), (self.START + 100, self.START + 40 * 86400)):
+            del loads[:]
+            values = [raw for timestamp, raw in samples if start <= timestamp < end]
+            summary = reader.summary(7, start, end)
+            self.assertEqual(summary['count'], len(values))
+            self.assertEqual(summary['min'], min(values) / HistoryFile.SCALE)
+            self.assertEqual(summary['max'], max(values) / HistoryFile.SCALE)
+            self.assertAlmostEqual(summary['mean'], sum(values) / len(values) / HistoryFile.SCALE)
+            self.assertLessEqual(len(loads), 4)
+        self.assertIsNone(reader.summary(7, self.START - 7200, self.START - 3600))
+
+    def test_summary_after_unclean_stop(self):
+        self.START = 1789999200.0
+        store, samples = self.fill(1, 900)
+        store.flush()
+        store = ColumnStore(self.directory, chunk_size=4096, flush_period=0)
+        columns = store.sensors[7] = SensorColumns(os.path.join(self.directory, '7'), store.chunk_size, store.RESOLUTIONS)
+        for index in range(900, 4500):
+            timestamp = self.START + index + 0.25
+            raw = HistoryFile.encode(29.0 if index == 1000 else 20.0)
+            columns.add(timestamp, raw)
+            samples.append((timestamp, raw))
+        store.close()
+        reader = ColumnReader(self.directory)
+        values = [raw for timestamp, raw in samples]
+        self.assertEqual(len(reader.samples(7)[1]), 4500)
+        summary = reader.summary(7, self.START, self.START + 86400)
+        self.assertEqual((summary['count'], summary['min'], summary['max']), (4500, min(values) / HistoryFile.SCALE, 29.0))
+        self.assertEqual(os.path.getsize(os.path.join(self.directory, '7', 'rollup_3600.bin')), 2 * Rollup.RECORD.size)
+
+
+if __name__ == '__main__':
+    unittest.main()